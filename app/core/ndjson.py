@@ -0,0 +1,67 @@
+import json
+import logging
+from typing import Any, AsyncIterator, Iterable, Iterator, List
+
+from fastapi import Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+
+logger = logging.getLogger(__name__)
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+def wants_ndjson(request: Request) -> bool:
+    """True when the client opted into streaming with `Accept: application/x-ndjson`."""
+    return NDJSON_MEDIA_TYPE in request.headers.get("accept", "")
+
+
+def _lines(chunk: List[Any]) -> bytes:
+    # same encoding as the JSON endpoints (ISO datetimes etc.)
+    return "".join(json.dumps(item) + "\n" for item in jsonable_encoder(chunk)).encode()
+
+
+def _error_line(e: Exception) -> bytes:
+    # the status line is already sent, so a failure mid-stream ends with an error record
+    logger.error(f"❌ NDJSON stream aborted: {repr(e)}")
+    return (json.dumps({"error": str(e) or repr(e)}) + "\n").encode()
+
+
+async def _encode_async(first: List[Any], rest: AsyncIterator[List[Any]]) -> AsyncIterator[bytes]:
+    yield _lines(first)
+    try:
+        async for chunk in rest:
+            yield _lines(chunk)
+    except Exception as e:
+        yield _error_line(e)
+
+
+def _encode_sync(first: List[Any], rest: Iterator[List[Any]]) -> Iterator[bytes]:
+    yield _lines(first)
+    try:
+        for chunk in rest:
+            yield _lines(chunk)
+    except Exception as e:
+        yield _error_line(e)
+
+
+def ndjson_response(chunks: Iterable[List[Any]]) -> StreamingResponse:
+    """
+    Stream lists of records as NDJSON, one record per line.
+
+    The first chunk is pulled before the response starts, so errors raised
+    up front (HTTPException included) still produce a proper status code.
+    Memory use is bounded by one chunk rather than the whole result.
+    """
+    chunks = iter(chunks)
+    first = next(chunks, [])
+    return StreamingResponse(_encode_sync(first, chunks), media_type=NDJSON_MEDIA_TYPE)
+
+
+async def ndjson_response_async(chunks: AsyncIterator[List[Any]]) -> StreamingResponse:
+    """`ndjson_response` for an async generator of chunks."""
+    try:
+        first = await chunks.__anext__()
+    except StopAsyncIteration:
+        first = []
+    return StreamingResponse(_encode_async(first, chunks), media_type=NDJSON_MEDIA_TYPE)
@@ -3,6 +3,10 @@ from fastapi.middleware.cors import CORSMiddleware
 from app.api.v1.routes import router as api_router
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
 from app.db.db import engine, init_db
+from app.modules.mt5_manager.admin_pool import admin_pool
+from app.modules.mt5_manager.deal_store import init_deal_store
+from app.modules.mt5_manager.pnl_rollup import init_rollup_tables, start_rollup_refresher, stop_rollup_refresher
+from app.modules.mt5_manager.sessions import start_configured_sessions, stop_all_sessions
 
 
 import logging.config
@@ -68,6 +72,18 @@ logging.config.dictConfig(LOGGING_CONFIG)
 async def on_startup():
     async with engine.begin() as conn:
         await init_db()
+    init_deal_store()
+    await init_rollup_tables()
+    start_rollup_refresher()
+    # connect configured MT5 Manager sessions in the background
+    await start_configured_sessions()
+
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    await stop_rollup_refresher()
+    await stop_all_sessions()
+    admin_pool.close_all()
 
 
 @app.get("/")
@@ -1,5 +1,5 @@
 from sqlalchemy import (
-    Column, Integer, String, Float, DateTime, JSON, ForeignKey
+    Column, Integer, String, Float, Date, DateTime, JSON, ForeignKey
 )
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
@@ -85,3 +85,33 @@ class FXRate(Base):
     date    = Column(DateTime, index=True)
     rate    = Column(Float)                 # USD per base
 
+
+class PnLDailyDeals(Base):
+    """Deal P&L rolled up per open day × close day × symbol × group."""
+    __tablename__ = "pnl_daily_deals"
+    id          = Column(Integer, primary_key=True, index=True)
+    open_day    = Column(Date, index=True)
+    close_day   = Column(Date, index=True)
+    symbol      = Column(String, index=True)
+    group_id    = Column(Integer, index=True)
+    markup      = Column(Float, default=0.0)
+    commission  = Column(Float, default=0.0)
+    swap        = Column(Float, default=0.0)
+    deals       = Column(Integer, default=0)
+
+
+class PnLDailyFills(Base):
+    """LP cost of terminal fills rolled up per day × symbol."""
+    __tablename__ = "pnl_daily_fills"
+    id       = Column(Integer, primary_key=True, index=True)
+    day      = Column(Date, index=True)
+    symbol   = Column(String, index=True)
+    lp_cost  = Column(Float, default=0.0)
+    fills    = Column(Integer, default=0)
+
+
+class PnLRollupState(Base):
+    """Highest source row id already folded into a rollup table."""
+    __tablename__ = "pnl_rollup_state"
+    name     = Column(String, primary_key=True)   # "deals" / "fills"
+    last_id  = Column(Integer, default=0)
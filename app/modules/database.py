@@ -1,4 +1,4 @@
-from sqlalchemy import create_engine, Column, Integer, String, Float, DateTime
+from sqlalchemy import create_engine, Column, Integer, String, Float, DateTime, JSON, Index, UniqueConstraint
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
@@ -32,4 +32,33 @@ class MT5Position(Base):
     price_close = Column(Float, nullable=False)
     profit = Column(Float, nullable=False)
     time_open = Column(DateTime, nullable=False)
-    time_close = Column(DateTime, nullable=False)
\ No newline at end of file
+    time_close = Column(DateTime, nullable=False)
+
+
+# Local copy of MT5 Manager deal history, filled by the deal store sync job
+class MT5StoredDeal(Base):
+    __tablename__ = "mt5_deals"
+
+    id = Column(Integer, primary_key=True, index=True)
+    manager_id = Column(String, nullable=False)
+    ticket = Column(Integer, nullable=False)
+    login = Column(Integer, nullable=True)
+    symbol = Column(String, nullable=True)
+    time = Column(Integer, nullable=False)   # deal time, unix seconds
+    data = Column(JSON, nullable=False)      # parse_deal() output
+
+    __table_args__ = (
+        UniqueConstraint("manager_id", "ticket", name="uq_mt5_deals_manager_ticket"),
+        Index("ix_mt5_deals_manager_time", "manager_id", "time"),
+        Index("ix_mt5_deals_manager_login_time", "manager_id", "login", "time"),
+    )
+
+
+# Sync watermark per manager: deals in [synced_from, synced_to) are complete locally
+class MT5DealSyncState(Base):
+    __tablename__ = "mt5_deal_sync"
+
+    manager_id = Column(String, primary_key=True)
+    source = Column(String, nullable=True)   # "server/login" the deals were synced from
+    synced_from = Column(Integer, nullable=False)
+    synced_to = Column(Integer, nullable=False)
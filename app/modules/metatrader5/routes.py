@@ -1,8 +1,9 @@
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, HTTPException, Query, Request
 from datetime import datetime
 import logging
 from typing import Optional
 
+from app.core.ndjson import ndjson_response, wants_ndjson
 from app.modules.metatrader5.terminal import (
     get_mt5_service,
     get_existing_service,
@@ -53,14 +54,24 @@ def disconnect_metatrader5(identifier: str):
 
 @router.get("/{identifier}/history")
 def history_deals(
+    request: Request,
     identifier: str,
     from_date: datetime = Query(..., description="Start datetime, e.g. 2025-04-17T00:00:00"),
     to_date: Optional[datetime] = Query(None, description="End datetime, defaults to now"),
     group_filter: str = Query("*,!*EUR*,!*GBP*", description="MT5 group filter string")
 ):
+    """
+    Deal history for the range. Send `Accept: application/x-ndjson` to get the
+    deals streamed one per line, fetched a day at a time.
+    """
     service = get_existing_service(identifier)
     if not service:
         raise HTTPException(status_code=404, detail="Identifier not found")
+    if wants_ndjson(request):
+        try:
+            return ndjson_response(service.iter_deal_history(from_date, to_date, group_filter))
+        except RuntimeError as e:
+            raise HTTPException(status_code=500, detail=f"Error fetching deals: {e}")
     deals, err = service.get_deal_history(from_date, to_date, group_filter)
     if err:
         raise HTTPException(status_code=500, detail=f"Error fetching deals: {err}")
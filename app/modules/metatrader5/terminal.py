@@ -1,8 +1,8 @@
 import os
 import logging
 import MetaTrader5 as mt5
-from datetime import datetime
-from typing import Dict, Optional, Tuple, List
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, Optional, Tuple, List
 
 logger = logging.getLogger(__name__)
 
@@ -10,6 +10,14 @@ logger = logging.getLogger(__name__)
 
 _service_instances: Dict[str, "MetaTrader5Service"] = {}
 
+def _deal_to_dict(deal) -> dict:
+    dd = deal._asdict()
+    ts = dd.get("time")
+    if isinstance(ts, (int, float)):
+        dd["time"] = datetime.fromtimestamp(ts).isoformat()
+    return dd
+
+
 class MetaTrader5Service:
     def __init__(self, path: str, login: int, password: str, server: str):
         self.login = login
@@ -73,14 +81,34 @@ class MetaTrader5Service:
             err = mt5.last_error()
             logger.error(f"history_deals_get failed: {err}")
             return None, err
-        result: List[dict] = []
-        for d in deals:
-            dd = d._asdict()
-            ts = dd.get("time")
-            if isinstance(ts, (int, float)):
-                dd["time"] = datetime.fromtimestamp(ts).isoformat()
-            result.append(dd)
-        return result, None
+        return [_deal_to_dict(d) for d in deals], None
+
+    def iter_deal_history(
+        self,
+        from_date: datetime,
+        to_date: Optional[datetime] = None,
+        group_filter: str = "*,!*EUR*,!*GBP*",
+        window: timedelta = timedelta(days=1),
+    ) -> Iterator[List[dict]]:
+        """
+        Like get_deal_history, but requests the range one `window` at a time
+        and yields each window's deals, so only one window is held in memory.
+        Raises RuntimeError when not connected or a request fails.
+        """
+        if not self._connected:
+            raise RuntimeError("Not connected to MT5")
+        if to_date is None:
+            to_date = datetime.now()
+        start = from_date
+        while start <= to_date:
+            end = min(start + window - timedelta(seconds=1), to_date)
+            deals = mt5.history_deals_get(start, end, group=group_filter)
+            if deals is None:
+                err = mt5.last_error()
+                logger.error(f"history_deals_get failed: {err}")
+                raise RuntimeError(str(err))
+            yield [_deal_to_dict(d) for d in deals]
+            start = end + timedelta(seconds=1)
 
     def get_symbols(
         self,
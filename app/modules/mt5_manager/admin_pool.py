@@ -0,0 +1,164 @@
+# app/modules/mt5_manager/admin_pool.py
+
+import hashlib
+import hmac
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import MT5Manager
+
+logger = logging.getLogger(__name__)
+
+# Idle time (s) after which a pooled AdminAPI session is disconnected, idle time
+# after which it is health-probed before reuse, and lifetime of a cached symbol dump.
+ADMIN_IDLE_TIMEOUT = float(os.getenv("MT5_ADMIN_IDLE_TIMEOUT", "600"))
+ADMIN_PROBE_AFTER = 30.0
+ADMIN_SYMBOLS_TTL = float(os.getenv("MT5_ADMIN_SYMBOLS_TTL", "60"))
+
+
+def _secret(password: str) -> bytes:
+    return hashlib.sha256(password.encode("utf-8")).digest()
+
+
+class AdminSession:
+    """One authenticated AdminAPI connection plus data cached on it."""
+
+    def __init__(self, host: str, login: int, password: str, admin):
+        self.host = host
+        self.login = login
+        self.secret = _secret(password)
+        self.admin = admin
+        self.lock = threading.Lock()  # one caller at a time per connection
+        self.last_used = time.monotonic()
+        self.symbols: Optional[List[Dict[str, Any]]] = None
+        self.symbols_at = 0.0
+
+    def matches(self, password: str) -> bool:
+        return hmac.compare_digest(self.secret, _secret(password))
+
+    def healthy(self) -> bool:
+        try:
+            return bool(self.admin.TimeServer())
+        except Exception as e:
+            logger.warning(f"AdminAPI probe raised for {self.login}@{self.host}: {repr(e)}")
+            return False
+
+    def close(self):
+        try:
+            self.admin.Disconnect()
+        except Exception as e:
+            logger.error(f"Error disconnecting AdminAPI {self.login}@{self.host}: {repr(e)}")
+
+
+class AdminAPIPool:
+    """
+    Authenticated AdminAPI sessions keyed by (host, login), reused across
+    requests instead of a Connect/Disconnect handshake per call.
+
+    A session is only handed out for the password it was opened with, is
+    probed before reuse once it has been idle for a while, and is closed
+    after ADMIN_IDLE_TIMEOUT without use.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._sessions: Dict[Tuple[str, int], AdminSession] = {}
+        self._connecting: Dict[Tuple[str, int], threading.Lock] = {}
+
+    @contextmanager
+    def session(self, host: str, login: int, password: str, timeout: int) -> Iterator[AdminSession]:
+        """
+        Blocking: yield a connected session for (host, login), held
+        exclusively for the duration. Raises ConnectionError if a new
+        connection fails. If the block raises, the session is assumed
+        broken and dropped from the pool.
+        """
+        self.expire_idle()
+        session = self._checkout(host, login, password, timeout)
+        try:
+            yield session
+        except BaseException:
+            logger.warning(f"⚠️ AdminAPI call failed on {login}@{host}, dropping the session")
+            self._discard((host, login), session)
+            raise
+        finally:
+            session.last_used = time.monotonic()
+            session.lock.release()
+
+    def _checkout(self, host: str, login: int, password: str, timeout: int) -> AdminSession:
+        """Lock and return the pooled session for (host, login), connecting one if needed."""
+        key = (host, login)
+        while True:
+            with self._lock:
+                session = self._sessions.get(key)
+                connect_lock = self._connecting.setdefault(key, threading.Lock())
+            # never hand an authenticated session to other credentials
+            if session is not None and session.matches(password):
+                session.lock.acquire()
+                if self._sessions.get(key) is not session:
+                    # replaced while we waited: take the current one instead
+                    session.lock.release()
+                    continue
+                idle = time.monotonic() - session.last_used
+                if idle < ADMIN_PROBE_AFTER or session.healthy():
+                    return session
+                logger.warning(f"⚠️ Pooled AdminAPI session {login}@{host} is dead, reconnecting")
+                self._discard(key, session)
+                session.lock.release()
+
+            # one connect per key at a time; whoever waited reuses the fresh session
+            with connect_lock:
+                current = self._sessions.get(key)
+                if current is not None and current is not session and current.matches(password):
+                    continue
+                return self._connect(host, login, password, timeout)
+
+    def _connect(self, host: str, login: int, password: str, timeout: int) -> AdminSession:
+        """Open a session and publish it in the pool, already locked for the caller."""
+        admin = MT5Manager.AdminAPI()
+        # the 4th parameter is reserved—must be 0
+        if not admin.Connect(host, login, password, 0, timeout):
+            raise ConnectionError(f"Connection failed: {MT5Manager.LastError()}")
+        session = AdminSession(host, login, password, admin)
+        session.lock.acquire()
+        with self._lock:
+            previous = self._sessions.get((host, login))
+            self._sessions[(host, login)] = session
+        if previous is not None:
+            with previous.lock:
+                previous.close()
+        logger.info(f"✅ AdminAPI session opened for {login}@{host}")
+        return session
+
+    def _discard(self, key: Tuple[str, int], session: AdminSession):
+        """Drop and close `session`; the caller holds its lock."""
+        with self._lock:
+            if self._sessions.get(key) is session:
+                del self._sessions[key]
+        session.close()
+
+    def expire_idle(self):
+        now = time.monotonic()
+        with self._lock:
+            expired = [
+                (key, s) for key, s in self._sessions.items()
+                if now - s.last_used >= ADMIN_IDLE_TIMEOUT and not s.lock.locked()
+            ]
+            for key, _ in expired:
+                del self._sessions[key]
+        for (host, login), session in expired:
+            session.close()
+            logger.info(f"🧹 Closed idle AdminAPI session {login}@{host}")
+
+    def close_all(self):
+        with self._lock:
+            sessions, self._sessions = list(self._sessions.values()), {}
+        for session in sessions:
+            session.close()
+
+
+admin_pool = AdminAPIPool()
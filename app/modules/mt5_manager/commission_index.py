@@ -0,0 +1,108 @@
+# app/modules/mt5_manager/commission_index.py
+
+from bisect import bisect_left
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # vector lookups fall back to a loop
+    np = None
+
+Tier = Tuple[float, float, float]  # (range_from, range_to, value), both ends inclusive
+
+
+class TierIndex:
+    """
+    Commission tiers of one group (and category) compiled for binary search.
+
+    The tier boundaries split the volume axis into boundary points and the
+    open gaps between them; each piece gets the value of the first tier
+    covering it, so overlapping tiers resolve exactly like a first-match
+    scan in tier order.
+    """
+
+    __slots__ = ("points", "point_values", "gap_values", "_np")
+
+    def __init__(self, tiers: Iterable[Tier]):
+        tiers = [t for t in tiers if t[0] is not None and t[1] is not None and t[2] is not None]
+        self.points: List[float] = sorted({b for t in tiers for b in t[:2]})
+
+        def first(lo, hi):
+            """Value of the first tier containing [lo, hi], else 0."""
+            return next((value for range_from, range_to, value in tiers
+                         if range_from <= lo and hi <= range_to), 0.0)
+
+        self.point_values = [first(p, p) for p in self.points]
+        # gap i lies between points[i-1] and points[i]; the outer two are never covered
+        self.gap_values = [0.0] + [
+            first(a, b) for a, b in zip(self.points, self.points[1:])
+        ] + [0.0]
+        self._np = None
+
+    def rate(self, volume: float) -> float:
+        i = bisect_left(self.points, volume)
+        if i < len(self.points) and self.points[i] == volume:
+            return self.point_values[i]
+        return self.gap_values[i]
+
+    def rates(self, volumes: Sequence[float]):
+        """Rates for a whole vector of volumes (an ndarray when NumPy is available)."""
+        if np is None:
+            return [self.rate(v) for v in volumes]
+        if self._np is None:
+            self._np = (np.array(self.points, dtype=float),
+                        np.array(self.point_values + [0.0], dtype=float),
+                        np.array(self.gap_values, dtype=float))
+        points, point_values, gap_values = self._np
+        volumes = np.asarray(volumes, dtype=float)
+        i = np.searchsorted(points, volumes, side="left")
+        on_point = points[np.minimum(i, len(points) - 1)] == volumes if len(points) else False
+        return np.where(on_point, point_values[i], gap_values[i])
+
+
+_EMPTY = TierIndex(())
+
+
+class CommissionIndex:
+    """
+    TierIndex per (group, category), plus one per group over all of its
+    categories in tier order (category None), which is what P&L uses.
+    Groups are keyed by whatever identifies them at the source: group_id
+    for CommissionTier rows, the group name for live group configurations.
+    """
+
+    def __init__(self, tiers: Dict[Tuple[Hashable, Optional[str]], List[Tier]]):
+        self._index = {key: TierIndex(t) for key, t in tiers.items()}
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Tuple[Hashable, Optional[str], float, float, float]]) -> "CommissionIndex":
+        """From (group_id, category, range_from, range_to, value) rows in CommissionTier id order."""
+        tiers: Dict[Tuple[Hashable, Optional[str]], List[Tier]] = {}
+        for group, category, range_from, range_to, value in rows:
+            tiers.setdefault((group, None), []).append((range_from, range_to, value))
+            if category is not None:
+                tiers.setdefault((group, category), []).append((range_from, range_to, value))
+        return cls(tiers)
+
+    @classmethod
+    def from_group_configs(cls, groups: Iterable[Dict[str, Any]]) -> "CommissionIndex":
+        """From serialized group configurations (groups.serialize_group), keyed by group name."""
+        return cls.from_rows(
+            (grp.get("group_name"), comm.get("name"), tier["range_from"], tier["range_to"], tier["value"])
+            for grp in groups
+            for comm in grp.get("commissions") or ()
+            for tier in comm.get("tiers") or ()
+        )
+
+    def __contains__(self, group: Hashable) -> bool:
+        return (group, None) in self._index
+
+    def tiers(self, group: Hashable, category: Optional[str] = None) -> TierIndex:
+        return self._index.get((group, category), _EMPTY)
+
+    def rate(self, group: Hashable, volume: float, category: Optional[str] = None) -> float:
+        """Rate of the first tier of `group` (in `category`) whose range contains `volume`, else 0."""
+        return self.tiers(group, category).rate(volume)
+
+    def rates(self, group: Hashable, volumes: Sequence[float], category: Optional[str] = None):
+        return self.tiers(group, category).rates(volumes)
@@ -0,0 +1,361 @@
+# app/modules/mt5_manager/deal_store.py
+
+import datetime
+import logging
+import os
+import threading
+from typing import AsyncIterator, Awaitable, Callable, Dict, Iterable, List, Optional
+
+import MT5Manager
+from sqlalchemy.dialects.sqlite import insert
+
+from app.modules.database import SessionLocal, engine, MT5StoredDeal, MT5DealSyncState
+from app.modules.mt5_manager.deals_mapping import parse_deal
+from app.modules.mt5_manager.history import split_range
+
+logger = logging.getLogger(__name__)
+
+# How far back the first sync backfills, how much of the most recent history
+# is left to upstream (deals can still be arriving), and the width of one
+# DealRequestByGroup call while syncing.
+DEAL_STORE_ENABLED = os.getenv("MT5_DEAL_STORE", "1") == "1"
+BACKFILL_DAYS = int(os.getenv("MT5_DEAL_STORE_BACKFILL_DAYS", "31"))
+SYNC_LAG_SECONDS = 300
+SYNC_SLICE_SECONDS = 6 * 3600
+# Slices pulled per sync_once() call, so a timed-out call holds its worker briefly
+SYNC_SLICES_PER_CALL = 4
+# Synced history re-fetched after each (re)connect: dealer edits and deletes made
+# while no DealSink was listening only reach the store this way
+RESYNC_HOURS = float(os.getenv("MT5_DEAL_STORE_RESYNC_HOURS", "24"))
+
+# SQLite bound-parameter budget per IN (...) clause
+_IN_CHUNK = 900
+
+
+def init_deal_store():
+    """Create the deal store tables (application startup)."""
+    if DEAL_STORE_ENABLED:
+        MT5StoredDeal.__table__.create(bind=engine, checkfirst=True)
+        MT5DealSyncState.__table__.create(bind=engine, checkfirst=True)
+
+
+def to_timestamp(value) -> Optional[int]:
+    """
+    Deal times arrive as unix seconds or datetimes; store them as int seconds.
+    Naive datetimes are taken as UTC, never as the host's local time.
+    """
+    if value is None:
+        return None
+    if isinstance(value, datetime.datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=datetime.timezone.utc)
+        return int(value.timestamp())
+    return int(value)
+
+
+def from_timestamp(ts: int) -> datetime.datetime:
+    """Inverse of to_timestamp: a naive UTC datetime."""
+    return datetime.datetime.fromtimestamp(ts, datetime.timezone.utc).replace(tzinfo=None)
+
+
+class DealStore:
+    """
+    Local SQLite copy of one manager's deal history.
+
+    `sync_once()` pulls deals from the last watermark towards now minus
+    SYNC_LAG_SECONDS and advances the watermark, so the store is complete
+    for [synced_from, synced_to). History queries read that range locally
+    and only go upstream for what lies outside it. Later edits and deletes
+    reported by the DealSink are applied with `apply()`; `request_resync()`
+    re-fetches the most recent RESYNC_HOURS for those made while no sink
+    was listening.
+
+    The store belongs to one (identifier, server, login): if the identifier
+    is reused for other credentials, the stored deals are dropped.
+
+    The watermark is a whole second: each slice requests [synced_to,
+    slice_to - 1] inclusive, and deal times have second resolution, so a
+    deal on a slice boundary belongs to exactly one slice.
+    """
+
+    def __init__(self, identifier: str, server: str, login: int):
+        self.identifier = identifier
+        self.source = f"{server}/{login}"
+        self._sync_lock = threading.Lock()
+        self.synced_from: Optional[int] = None
+        self.synced_to: Optional[int] = None
+        # last sync ceiling, in server time (see sync_once)
+        self._ceiling: Optional[int] = None
+        # watermark to rewind to on the next sync (see request_resync)
+        self._resync_to: Optional[int] = None
+        self._load_state()
+
+    def _load_state(self):
+        db = SessionLocal()
+        try:
+            state = db.get(MT5DealSyncState, self.identifier)
+            if state is not None and state.source != self.source:
+                logger.warning(
+                    f"Deal store {self.identifier} was synced from {state.source}, "
+                    f"not {self.source}: dropping it"
+                )
+                db.query(MT5StoredDeal).filter(MT5StoredDeal.manager_id == self.identifier).delete(
+                    synchronize_session=False
+                )
+                db.delete(state)
+                db.commit()
+            elif state is not None:
+                self.synced_from, self.synced_to = state.synced_from, state.synced_to
+        finally:
+            db.close()
+
+    @property
+    def ready(self) -> bool:
+        return self.synced_to is not None and self.served_to > self.synced_from
+
+    @property
+    def served_to(self) -> Optional[int]:
+        """End of the range queries may read locally: the watermark, less any pending resync."""
+        resync_to = self._resync_to
+        if resync_to is not None and self.synced_to is not None:
+            return min(self.synced_to, resync_to)
+        return self.synced_to
+
+    @property
+    def behind(self) -> bool:
+        """More history was ready at the last sync than one sync_once() call took, or a resync is pending."""
+        return (
+            self.synced_to is None or self._ceiling is None or self.synced_to < self._ceiling
+            or self._resync_to is not None
+        )
+
+    def covers(self, ts_from: int) -> bool:
+        """True when local history starts early enough to serve a range beginning at `ts_from`."""
+        return self.ready and self.synced_from <= ts_from < self.served_to
+
+    def request_resync(self, hours: float = RESYNC_HOURS):
+        """Thread-safe: re-fetch the last `hours` of synced history on the next sync."""
+        if self.synced_to is not None:
+            self._resync_to = max(self.synced_from, self.synced_to - int(hours * 3600))
+
+    # ——— sync ———
+
+    def sync_once(self, manager, max_slices: int = SYNC_SLICES_PER_CALL) -> Optional[int]:
+        """
+        Blocking: pull up to `max_slices` slices after the watermark. Returns
+        the number of deals stored, or None if another sync is still running;
+        raises RuntimeError if a request fails.
+
+        Deal times and request bounds are MT5 server time, so the ceiling is
+        the server's clock (TimeServer) minus SYNC_LAG_SECONDS, never the
+        host's: a server zone behind UTC would otherwise push the watermark
+        past deals that have not arrived yet.
+        """
+        if not self._sync_lock.acquire(blocking=False):
+            return None  # another sync for this manager is still running
+        try:
+            server_now = manager.TimeServer()
+            if not server_now:
+                raise RuntimeError(f"TimeServer failed: {MT5Manager.LastError()}")
+            upper = self._ceiling = to_timestamp(server_now) - SYNC_LAG_SECONDS
+            if self.synced_to is None:
+                self.synced_from = self.synced_to = upper - BACKFILL_DAYS * 86400
+            if self._resync_to is not None:
+                self.synced_to = min(self.synced_to, self._resync_to)
+                self._resync_to = None
+
+            stored = 0
+            for _ in range(max_slices):
+                if self.synced_to >= upper:
+                    break
+                slice_to = min(self.synced_to + SYNC_SLICE_SECONDS, upper)
+                deals = manager.DealRequestByGroup("*", from_timestamp(self.synced_to), from_timestamp(slice_to - 1))
+                if deals is False:
+                    raise RuntimeError(f"DealRequestByGroup failed: {MT5Manager.LastError()}")
+                stored += self._store([parse_deal(deal) for deal in deals], self.synced_to, slice_to)
+            if stored:
+                logger.info(f"✅ Deal store {self.identifier}: {stored} deals synced up to {self.synced_to}")
+            return stored
+        finally:
+            self._sync_lock.release()
+
+    def _store(self, deals: List[Dict], slice_from: int, synced_to: int) -> int:
+        """
+        Replace the stored deals of [slice_from, synced_to) with one fetched
+        slice and advance the watermark, in the same transaction. Replacing
+        rather than upserting drops deals deleted since a slice was last synced.
+        """
+        rows = self._rows(deals)
+        db = SessionLocal()
+        try:
+            db.query(MT5StoredDeal).filter(
+                MT5StoredDeal.manager_id == self.identifier,
+                MT5StoredDeal.time >= slice_from,
+                MT5StoredDeal.time < synced_to,
+            ).delete(synchronize_session=False)
+            self._upsert(db, rows)
+            state = db.get(MT5DealSyncState, self.identifier)
+            if state is None:
+                state = MT5DealSyncState(manager_id=self.identifier, source=self.source, synced_from=self.synced_from)
+                db.add(state)
+            state.synced_to = synced_to
+            db.commit()
+        finally:
+            db.close()
+        self.synced_to = synced_to
+        return len(rows)
+
+    def _rows(self, deals: List[Dict]) -> List[Dict]:
+        return [
+            {
+                "manager_id": self.identifier,
+                "ticket": d["ticket"],
+                "login": d["login"],
+                "symbol": d["symbol"],
+                "time": to_timestamp(d["time"]),
+                "data": d,
+            }
+            for d in deals
+        ]
+
+    @staticmethod
+    def _upsert(db, rows: List[Dict]):
+        if not rows:
+            return
+        stmt = insert(MT5StoredDeal)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["manager_id", "ticket"],
+            set_={"login": stmt.excluded.login, "symbol": stmt.excluded.symbol,
+                  "time": stmt.excluded.time, "data": stmt.excluded.data},
+        )
+        db.execute(stmt, rows)
+
+    def apply(self, op: str, deals: List[Dict]):
+        """
+        Blocking: apply deals the dealer edited ("update") or removed
+        ("delete") after they were synced, so the stored range never serves
+        a stale or deleted deal.
+        """
+        if not deals:
+            return
+        db = SessionLocal()
+        try:
+            if op == "update":
+                self._upsert(db, self._rows(deals))
+            elif op == "delete":
+                tickets = [d["ticket"] for d in deals]
+                for i in range(0, len(tickets), _IN_CHUNK):
+                    db.query(MT5StoredDeal).filter(
+                        MT5StoredDeal.manager_id == self.identifier,
+                        MT5StoredDeal.ticket.in_(tickets[i:i + _IN_CHUNK]),
+                    ).delete(synchronize_session=False)
+            else:
+                raise ValueError(f"unknown deal store op {op!r}")
+            db.commit()
+        finally:
+            db.close()
+        logger.debug(f"Deal store {self.identifier}: applied {op} of {len(deals)} deals")
+
+    # ——— queries ———
+
+    def query(self, ts_from: int, ts_to: int, logins: Optional[Iterable[int]] = None,
+              symbol: Optional[str] = None) -> List[Dict]:
+        """Stored deals with ts_from <= time <= ts_to, optionally filtered, in time order."""
+        db = SessionLocal()
+        try:
+            base = db.query(MT5StoredDeal.time, MT5StoredDeal.ticket, MT5StoredDeal.data).filter(
+                MT5StoredDeal.manager_id == self.identifier,
+                MT5StoredDeal.time >= ts_from,
+                MT5StoredDeal.time <= ts_to,
+            )
+            if symbol is not None:
+                base = base.filter(MT5StoredDeal.symbol == symbol)
+            if logins is None:
+                rows = base.all()
+            else:
+                logins = list(logins)
+                rows = []
+                for i in range(0, len(logins), _IN_CHUNK):
+                    rows.extend(base.filter(MT5StoredDeal.login.in_(logins[i:i + _IN_CHUNK])).all())
+        finally:
+            db.close()
+        rows.sort(key=lambda r: (r[0], r[1]))
+        return [r[2] for r in rows]
+
+
+async def fetch_history(
+    svc,
+    upstream: Callable[[datetime.datetime, datetime.datetime], Awaitable[List[Dict]]],
+    date_from: datetime.datetime,
+    date_to: datetime.datetime,
+    logins: Optional[List[int]] = None,
+    groups: Optional[str] = None,
+    symbol: Optional[str] = None,
+) -> List[Dict]:
+    """
+    Deal history for [date_from, date_to], answered from the local store
+    where it is synced and from `await upstream(date_from, date_to)` (parsed
+    DealRequest* calls) for the rest. Group masks are resolved to logins
+    with UserLogins so the store can be queried by login.
+    """
+    store = getattr(svc, "deal_store", None)
+    ts_from, ts_to = to_timestamp(date_from), to_timestamp(date_to)
+    if store is None or not store.covers(ts_from):
+        return await upstream(date_from, date_to)
+
+    if groups is not None:
+        logins = await svc.run(svc.manager.UserLogins, groups)
+        if logins is False:
+            logger.warning(f"UserLogins({groups!r}) failed, falling back upstream: {MT5Manager.LastError()}")
+            return await upstream(date_from, date_to)
+
+    synced_to = store.served_to
+    deals = await svc.run(
+        store.query, ts_from, min(ts_to, synced_to - 1), logins=logins, symbol=symbol,
+        timeout=svc.HISTORY_TIMEOUT,
+    )
+    if ts_to >= synced_to:
+        seen = {d["ticket"] for d in deals}
+        tail = await upstream(from_timestamp(synced_to), date_to)
+        deals.extend(d for d in tail if d["ticket"] not in seen)
+    return deals
+
+
+async def iter_history(
+    svc,
+    upstream: Callable[[datetime.datetime, datetime.datetime], AsyncIterator[List[Dict]]],
+    date_from: datetime.datetime,
+    date_to: datetime.datetime,
+    logins: Optional[List[int]] = None,
+    groups: Optional[str] = None,
+    symbol: Optional[str] = None,
+) -> AsyncIterator[List[Dict]]:
+    """
+    Streaming `fetch_history`: yields the stored range one time window at a
+    time, then the chunks of `upstream(date_from, date_to)` for the tail.
+    """
+    store = getattr(svc, "deal_store", None)
+    ts_from, ts_to = to_timestamp(date_from), to_timestamp(date_to)
+    if store is None or not store.covers(ts_from):
+        async for chunk in upstream(date_from, date_to):
+            yield chunk
+        return
+
+    if groups is not None:
+        logins = await svc.run(svc.manager.UserLogins, groups)
+        if logins is False:
+            logger.warning(f"UserLogins({groups!r}) failed, falling back upstream: {MT5Manager.LastError()}")
+            async for chunk in upstream(date_from, date_to):
+                yield chunk
+            return
+
+    synced_to = store.served_to
+    local_to = from_timestamp(min(ts_to, synced_to - 1))
+    for a, b in split_range(from_timestamp(ts_from), local_to):
+        yield await svc.run(
+            store.query, to_timestamp(a), to_timestamp(b), logins=logins, symbol=symbol,
+            timeout=svc.HISTORY_TIMEOUT,
+        )
+    if ts_to >= synced_to:
+        async for chunk in upstream(from_timestamp(synced_to), date_to):
+            yield chunk
@@ -1,148 +1,202 @@
-def parse_deal(deal):
+from operator import attrgetter
+
+# Mapping for IMTDeal::EnDealAction
+DEAL_ACTION_MAP = {
+    0: "Buy",
+    1: "Sell",
+    2: "Balance",
+    3: "Credit",
+    4: "Charge",
+    5: "Correction",
+    6: "Bonus",
+    7: "Commission",
+    8: "Daily Commission",
+    9: "Monthly Commission",
+    10: "Daily Agent Commission",
+    11: "Monthly Agent Commission",
+    12: "Interest Rate",
+    13: "Buy Canceled",
+    14: "Sell Canceled",
+    15: "Dividend",
+    16: "Dividend Franked",
+    17: "Tax",
+    18: "Agent",
+    19: "Stop Out Compensation",
+    20: "Stop Out Compensation Credit",
+}
+
+# Mapping for IMTDeal::EnDealEntry
+DEAL_ENTRY_MAP = {
+    0: "Entry In",
+    1: "Entry Out",
+    2: "Entry InOut",
+    3: "Entry Out By",
+}
+
+# Mapping for IMTDeal::EnDealReason
+DEAL_REASON_MAP = {
+    0: "Client",
+    1: "Expert",
+    2: "Dealer",
+    3: "Stop Loss",
+    4: "Take Profit",
+    5: "Stop Out",
+    6: "Rollover",
+    7: "External Client",
+    8: "Variation Margin",
+    9: "Gateway",
+    10: "Signal",
+    11: "Settlement",
+    12: "Transfer",
+    13: "Sync",
+    14: "External Service",
+    15: "Migration",
+    16: "Mobile",
+    17: "Web",
+    18: "Split",
+    19: "Corporate Action",
+}
+
+# Mapping for IMTDeal::EnTradeModifyFlags
+MODIFY_FLAGS_MAP = {
+    0x00000001: "Admin",
+    0x00000002: "Manager",
+    0x00000004: "Position",
+    0x00000008: "Restore",
+    0x00000010: "API Admin",
+    0x00000020: "API Manager",
+    0x00000040: "API Server",
+    0x00000080: "API Gateway",
+}
+
+_MODIFY_FLAGS_MASK = sum(MODIFY_FLAGS_MAP)
+
+# Every combination of the known modification flags, decoded once
+_MODIFY_FLAGS_TABLE = [
+    ", ".join(desc for bit, desc in MODIFY_FLAGS_MAP.items() if value & bit) or "None"
+    for value in range(_MODIFY_FLAGS_MASK + 1)
+]
+
+# (output key, IMTDeal attribute) in output order
+DEAL_FIELDS = (
+    ("ticket", "Deal"),
+    ("external_id", "ExternalID"),
+    ("login", "Login"),
+    ("dealer", "Dealer"),
+    ("order", "Order"),
+    ("action", "Action"),
+    ("entry", "Entry"),
+    ("digits", "Digits"),
+    ("digits_currency", "DigitsCurrency"),
+    ("contract_size", "ContractSize"),
+    ("time", "Time"),
+    ("symbol", "Symbol"),
+    ("price", "Price"),
+    ("price_sl", "PriceSL"),
+    ("price_tp", "PriceTP"),
+    ("volume", "Volume"),
+    ("volume_ext", "VolumeExt"),
+    ("volume_closed", "VolumeClosed"),
+    ("volume_closed_ext", "VolumeClosedExt"),
+    ("profit", "Profit"),
+    ("value", "Value"),
+    ("storage", "Storage"),
+    ("commission", "Commission"),
+    ("fee", "Fee"),
+    ("rate_profit", "RateProfit"),
+    ("rate_margin", "RateMargin"),
+    ("expert_id", "ExpertID"),
+    ("position_id", "PositionID"),
+    ("comment", "Comment"),
+    ("api_data_set", "ApiDataSet"),
+    ("api_data_update", "APIDataUpdate"),
+    ("api_data_next", "APIDataNext"),
+    ("api_data_get", "ApiDataGet"),
+    ("api_data_clear", "ApiDataClear"),
+    ("api_data_clear_all", "ApiDataClearAll"),
+    ("profit_raw", "ProfitRaw"),
+    ("price_position", "PricePosition"),
+    ("tick_value", "TickValue"),
+    ("tick_size", "TickSize"),
+    ("flags", "Flags"),
+    ("time_msc", "TimeMsc"),
+    ("reason", "Reason"),
+    ("gateway", "Gateway"),
+    ("price_gateway", "PriceGateway"),
+    ("market_bid", "MarketBid"),
+    ("market_ask", "MarketAsk"),
+    ("market_last", "MarketLast"),
+    ("modification_flags", "ModificationFlags"),
+)
+
+DEAL_KEYS = tuple(key for key, _ in DEAL_FIELDS)
+_ATTRS = tuple(attr for _, attr in DEAL_FIELDS)
+_DEFAULTS = tuple("Unknown" if key == "ticket" else None for key in DEAL_KEYS)
+
+# One C-level fetch of every attribute, as a tuple in DEAL_FIELDS order
+_fetch_all = attrgetter(*_ATTRS)
+
+_DECODED = {
+    "action": "_ACTION.get({v}, {v})",
+    "entry": "_ENTRY.get({v}, {v})",
+    "reason": "_REASON.get({v}, {v})",
+    "modification_flags": "_FLAGS_TABLE[{v} & _FLAGS_MASK] if {v} else 'None'",
+}
+
+
+def _compile_extractor():
     """
-    Parse a deal object and return a dictionary containing all the details.
-    Converts numeric enumerations into human-readable strings according to the documentation.
+    Build `_extract(deal) -> dict` as a single dict display with plain
+    attribute loads, so a parse is one function call and one allocation.
+    Raises AttributeError if the deal lacks any field.
     """
-
-    # Mapping for IMTDeal::EnDealAction
-    deal_action_map = {
-        0: "Buy",
-        1: "Sell",
-        2: "Balance",
-        3: "Credit",
-        4: "Charge",
-        5: "Correction",
-        6: "Bonus",
-        7: "Commission",
-        8: "Daily Commission",
-        9: "Monthly Commission",
-        10: "Daily Agent Commission",
-        11: "Monthly Agent Commission",
-        12: "Interest Rate",
-        13: "Buy Canceled",
-        14: "Sell Canceled",
-        15: "Dividend",
-        16: "Dividend Franked",
-        17: "Tax",
-        18: "Agent",
-        19: "Stop Out Compensation",
-        20: "Stop Out Compensation Credit",
+    lines = ["def _extract(d):"]
+    for key, attr in DEAL_FIELDS:
+        if key in _DECODED:
+            lines.append(f"    {key} = d.{attr}")
+    lines.append("    return {")
+    for key, attr in DEAL_FIELDS:
+        value = _DECODED[key].format(v=key) if key in _DECODED else f"d.{attr}"
+        lines.append(f"        {key!r}: {value},")
+    lines.append("    }")
+    namespace = {
+        "_ACTION": DEAL_ACTION_MAP,
+        "_ENTRY": DEAL_ENTRY_MAP,
+        "_REASON": DEAL_REASON_MAP,
+        "_FLAGS_TABLE": _MODIFY_FLAGS_TABLE,
+        "_FLAGS_MASK": _MODIFY_FLAGS_MASK,
     }
+    exec(compile("\n".join(lines), "<parse_deal>", "exec"), namespace)
+    return namespace["_extract"]
 
-    # Mapping for IMTDeal::EnDealEntry
-    deal_entry_map = {
-        0: "Entry In",
-        1: "Entry Out",
-        2: "Entry InOut",
-        3: "Entry Out By",
-    }
 
-    # Mapping for IMTDeal::EnDealReason
-    deal_reason_map = {
-        0: "Client",
-        1: "Expert",
-        2: "Dealer",
-        3: "Stop Loss",
-        4: "Take Profit",
-        5: "Stop Out",
-        6: "Rollover",
-        7: "External Client",
-        8: "Variation Margin",
-        9: "Gateway",
-        10: "Signal",
-        11: "Settlement",
-        12: "Transfer",
-        13: "Sync",
-        14: "External Service",
-        15: "Migration",
-        16: "Mobile",
-        17: "Web",
-        18: "Split",
-        19: "Corporate Action",
-    }
+_extract = _compile_extractor()
+
+
+def parse_modify_flags(flags_value) -> str:
+    if not flags_value:
+        return "None"
+    return _MODIFY_FLAGS_TABLE[flags_value & _MODIFY_FLAGS_MASK]
 
-    # Mapping for IMTDeal::EnTradeModifyFlags
-    modify_flags_map = {
-        0x00000001: "Admin",
-        0x00000002: "Manager",
-        0x00000004: "Position",
-        0x00000008: "Restore",
-        0x00000010: "API Admin",
-        0x00000020: "API Manager",
-        0x00000040: "API Server",
-        0x00000080: "API Gateway",
-    }
 
-    def parse_modify_flags(flags_value):
-        if not flags_value:
-            return "None"
-        result = []
-        for bit, desc in modify_flags_map.items():
-            if flags_value & bit:
-                result.append(desc)
-        if not result:
-            return "None"
-        return ", ".join(result)
-
-    # Get raw numeric values from the deal object
-    action_value = getattr(deal, "Action", None)
-    entry_value = getattr(deal, "Entry", None)
-    reason_value = getattr(deal, "Reason", None)
-    modification_flags_value = getattr(deal, "ModificationFlags", None)
-
-    # Convert numeric values to readable strings using our maps
-    action_str = deal_action_map.get(action_value, action_value)
-    entry_str = deal_entry_map.get(entry_value, entry_value)
-    reason_str = deal_reason_map.get(reason_value, reason_value)
-    modification_flags_str = parse_modify_flags(modification_flags_value)
-
-    return {
-        "ticket": getattr(deal, "Deal", "Unknown"),
-        "external_id": getattr(deal, "ExternalID", None),
-        "login": getattr(deal, "Login", None),
-        "dealer": getattr(deal, "Dealer", None),
-        "order": getattr(deal, "Order", None),
-        "action": action_str,
-        "entry": entry_str,
-        "digits": getattr(deal, "Digits", None),
-        "digits_currency": getattr(deal, "DigitsCurrency", None),
-        "contract_size": getattr(deal, "ContractSize", None),
-        "time": getattr(deal, "Time", None),
-        "symbol": getattr(deal, "Symbol", None),
-        "price": getattr(deal, "Price", None),
-        "price_sl": getattr(deal, "PriceSL", None),
-        "price_tp": getattr(deal, "PriceTP", None),
-        "volume": getattr(deal, "Volume", None),
-        "volume_ext": getattr(deal, "VolumeExt", None),
-        "volume_closed": getattr(deal, "VolumeClosed", None),
-        "volume_closed_ext": getattr(deal, "VolumeClosedExt", None),
-        "profit": getattr(deal, "Profit", None),
-        "value": getattr(deal, "Value", None),
-        "storage": getattr(deal, "Storage", None),
-        "commission": getattr(deal, "Commission", None),
-        "fee": getattr(deal, "Fee", None),
-        "rate_profit": getattr(deal, "RateProfit", None),
-        "rate_margin": getattr(deal, "RateMargin", None),
-        "expert_id": getattr(deal, "ExpertID", None),
-        "position_id": getattr(deal, "PositionID", None),
-        "comment": getattr(deal, "Comment", None),
-        "api_data_set": getattr(deal, "ApiDataSet", None),
-        "api_data_update": getattr(deal, "APIDataUpdate", None),
-        "api_data_next": getattr(deal, "APIDataNext", None),
-        "api_data_get": getattr(deal, "ApiDataGet", None),
-        "api_data_clear": getattr(deal, "ApiDataClear", None),
-        "api_data_clear_all": getattr(deal, "ApiDataClearAll", None),
-        "profit_raw": getattr(deal, "ProfitRaw", None),
-        "price_position": getattr(deal, "PricePosition", None),
-        "tick_value": getattr(deal, "TickValue", None),
-        "tick_size": getattr(deal, "TickSize", None),
-        "flags": getattr(deal, "Flags", None),
-        "time_msc": getattr(deal, "TimeMsc", None),
-        "reason": reason_str,
-        "gateway": getattr(deal, "Gateway", None),
-        "price_gateway": getattr(deal, "PriceGateway", None),
-        "market_bid": getattr(deal, "MarketBid", None),
-        "market_ask": getattr(deal, "MarketAsk", None),
-        "market_last": getattr(deal, "MarketLast", None),
-        "modification_flags": modification_flags_str,
-    }
\ No newline at end of file
+def _fetch(deal) -> tuple:
+    """All raw attribute values; objects missing some fall back to per-field defaults."""
+    try:
+        return _fetch_all(deal)
+    except AttributeError:
+        return tuple(getattr(deal, attr, default) for attr, default in zip(_ATTRS, _DEFAULTS))
+
+
+def parse_deal(deal):
+    """
+    Parse a deal object and return a dictionary containing all the details.
+    Converts numeric enumerations into human-readable strings according to the documentation.
+    """
+    try:
+        return _extract(deal)
+    except AttributeError:
+        record = dict(zip(DEAL_KEYS, _fetch(deal)))
+        for key, table in (("action", DEAL_ACTION_MAP), ("entry", DEAL_ENTRY_MAP), ("reason", DEAL_REASON_MAP)):
+            record[key] = table.get(record[key], record[key])
+        record["modification_flags"] = parse_modify_flags(record["modification_flags"])
+        return record
@@ -0,0 +1,138 @@
+# app/modules/mt5_manager/fx_index.py
+
+import asyncio
+import logging
+import os
+import threading
+import time
+from bisect import bisect_right
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import FXRate
+
+logger = logging.getLogger(__name__)
+
+# Seconds between incremental reloads of new FXRate rows
+FX_REFRESH_INTERVAL = float(os.getenv("MT5_FX_REFRESH_INTERVAL", "60"))
+
+
+class FXRateIndex:
+    """
+    As-of index of USD rates: per currency, sorted timestamps and the
+    matching rates, so a lookup is one bisect instead of an
+    `ORDER BY date DESC` query.
+
+    Loaded in bulk from fx_rates and kept current by `refresh()`, which
+    only reads rows with an id above the last one seen.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._refresh_lock = asyncio.Lock()
+        self._times: Dict[str, List[datetime]] = {}
+        self._rates: Dict[str, List[float]] = {}
+        self._last_id = 0
+        self._refreshed_at = 0.0
+        self.loaded = False
+
+    def __len__(self) -> int:
+        return sum(len(t) for t in self._times.values())
+
+    def invalidate(self):
+        with self._lock:
+            self._times, self._rates, self._last_id = {}, {}, 0
+            self.loaded = False
+
+    def add(self, rows: Iterable[Tuple[int, str, datetime, float]]):
+        """Index (id, base, date, rate) rows; a later id wins on equal timestamps."""
+        with self._lock:
+            for row_id, base, at, rate in sorted(rows, key=lambda r: r[0]):
+                if base is None or at is None or rate is None:
+                    continue
+                base = base.upper()
+                times = self._times.setdefault(base, [])
+                rates = self._rates.setdefault(base, [])
+                if not times or at > times[-1]:
+                    times.append(at)
+                    rates.append(rate)
+                else:
+                    i = bisect_right(times, at)
+                    if i and times[i - 1] == at:
+                        rates[i - 1] = rate
+                    else:
+                        times.insert(i, at)
+                        rates.insert(i, rate)
+                self._last_id = max(self._last_id, row_id)
+
+    async def refresh(self, db: AsyncSession, force: bool = False):
+        """Load rows added since the last refresh (all rows on first use)."""
+        if not force and self.loaded and time.monotonic() - self._refreshed_at < FX_REFRESH_INTERVAL:
+            return
+        async with self._refresh_lock:
+            rows = (await db.execute(
+                select(FXRate.id, FXRate.base, FXRate.date, FXRate.rate)
+                .where(FXRate.id > self._last_id)
+                .order_by(FXRate.id)
+            )).all()
+            self.add(rows)
+            self._refreshed_at = time.monotonic()
+            if not self.loaded:
+                self.loaded = True
+                logger.info(f"✅ FX index loaded: {len(self)} rates, {len(self._times)} currencies")
+
+    # ——— lookups ———
+
+    def rate(self, currency: str, at: datetime) -> Optional[float]:
+        """USD per unit of `currency` as of `at`, or None if there is none yet."""
+        currency = currency.upper()
+        if currency == "USD":
+            return 1.0
+        with self._lock:
+            times = self._times.get(currency)
+            if not times:
+                return None
+            i = bisect_right(times, at)
+            return self._rates[currency][i - 1] if i else None
+
+    def rates(self, currencies: Sequence[str], times: Sequence[datetime]) -> List[Optional[float]]:
+        """Batched `rate()`: one result per (currency, time) pair, None where missing."""
+        result: List[Optional[float]] = [None] * len(currencies)
+        positions: Dict[str, List[int]] = {}
+        for i, currency in enumerate(currencies):
+            if currency is not None:
+                positions.setdefault(currency.upper(), []).append(i)
+
+        with self._lock:
+            for currency, idx in positions.items():
+                if currency == "USD":
+                    for i in idx:
+                        result[i] = 1.0
+                    continue
+                ts = self._times.get(currency)
+                if not ts:
+                    continue
+                rs = self._rates[currency]
+                for i in idx:
+                    j = bisect_right(ts, times[i])
+                    if j:
+                        result[i] = rs[j - 1]
+        return result
+
+    def convert(
+        self,
+        amounts: Sequence[float],
+        currencies: Sequence[str],
+        times: Sequence[datetime],
+    ) -> List[Optional[float]]:
+        """Amounts in USD at their own as-of rates, None where `rate()` has none."""
+        return [
+            None if rate is None else amount * rate
+            for amount, rate in zip(amounts, self.rates(currencies, times))
+        ]
+
+
+fx_index = FXRateIndex()
@@ -0,0 +1,87 @@
+# app/modules/mt5_manager/group_cache.py
+
+import threading
+import time
+import uuid
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+
+class GroupConfigCache:
+    """
+    Serialized group configurations of one manager.
+
+    The group sink marks single groups stale (`invalidate(name)`) or the
+    whole cache (`invalidate()`); `get()` re-serializes only what is stale,
+    and everything once the TTL has run out. `etag` changes only when the
+    served content actually changed.
+    """
+
+    def __init__(self, identifier: str, ttl: float):
+        self.identifier = identifier
+        self.ttl = ttl
+        self._lock = threading.Lock()       # serializes refreshes
+        self._mark_lock = threading.Lock()  # guards the stale marks, never held for long
+        self._groups: Dict[str, dict] = {}
+        self._stale: Set[str] = set()
+        self._complete = False
+        self._loaded_at = 0.0
+        self._token = uuid.uuid4().hex[:8]  # distinguishes ETags across restarts
+        self.generation = 0
+
+    @property
+    def etag(self) -> str:
+        return f'"{self.identifier}-{self._token}-{self.generation}"'
+
+    def invalidate(self, name: Optional[str] = None):
+        """Thread-safe and cheap (called from the pump thread): mark one group, or every group, stale."""
+        with self._mark_lock:
+            if name is None:
+                self._complete = False
+            else:
+                self._stale.add(name)
+
+    def _take_marks(self) -> Tuple[bool, Set[str]]:
+        with self._mark_lock:
+            expired = time.monotonic() - self._loaded_at >= self.ttl
+            reload_all = not self._complete or expired
+            stale, self._stale = self._stale, set()
+            self._complete = True
+            return reload_all, stale
+
+    def get(
+        self,
+        load_all: Callable[[], List[dict]],
+        load_one: Callable[[str], Optional[dict]],
+    ) -> Tuple[List[dict], str]:
+        """
+        Blocking: return (group configurations, etag), refreshing first.
+        `load_all()` serializes every group; `load_one(name)` one group, or
+        None when it no longer exists. Marks arriving during a refresh are
+        kept for the next call.
+        """
+        with self._lock:
+            reload_all, stale = self._take_marks()
+            try:
+                if reload_all:
+                    self._replace({g["group_name"]: g for g in load_all()})
+                    self._loaded_at = time.monotonic()
+                else:
+                    for name in stale:
+                        self._update(name, load_one(name))
+            except Exception:
+                self.invalidate()
+                raise
+            return list(self._groups.values()), self.etag
+
+    def _replace(self, groups: Dict[str, dict]):
+        if groups != self._groups:
+            self._groups = groups
+            self.generation += 1
+
+    def _update(self, name: str, group: Optional[dict]):
+        if group is None:
+            if self._groups.pop(name, None) is not None:
+                self.generation += 1
+        elif self._groups.get(name) != group:
+            self._groups[name] = group
+            self.generation += 1
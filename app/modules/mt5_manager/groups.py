@@ -3,7 +3,9 @@
 from fastapi import HTTPException
 import MT5Manager
 import inspect
+from typing import List, Tuple
 from app.modules.mt5_manager.manager import mt5_managers
+from app.modules.mt5_manager.serializers import to_dict
 
 # ———————————————————————————————————————————————
 # 1. Build a shared enum‐map from all IMTConGroup + symbol enums
@@ -12,6 +14,32 @@ from app.modules.mt5_manager.manager import mt5_managers
 _enum_maps = {}
 _symbol_enums_loaded = False
 
+# Decode tables derived from _enum_maps: value → first member name, and the
+# non-zero int members tried as bit flags.
+_enum_names = {}
+_enum_flags = {}
+# (enum_name, raw_value) → decoded bitmask, filled on first use; cleared when enums are registered
+_flag_cache = {}
+# SDK class → [(property, enum_name)] it exposes; rebuilt when enums are added
+_enum_props = {}
+
+
+def _register_enum(enum_name: str, members: dict):
+    _enum_maps[enum_name] = members
+    names = {}
+    for name, val in members.items():
+        try:
+            names.setdefault(val, name)
+        except TypeError:
+            pass  # unhashable member value, only reachable through the scan fallback
+    _enum_names[enum_name] = names
+    _enum_flags[enum_name] = tuple(
+        (name, val) for name, val in members.items() if isinstance(val, int) and val != 0
+    )
+    _flag_cache.clear()
+    _enum_props.clear()
+
+
 def _load_group_enums():
     for attr in dir(MT5Manager.MTConGroup):
         if not attr.startswith("En"):
@@ -24,7 +52,7 @@ def _load_group_enums():
                 if name.isupper()
             }
             if members:
-                _enum_maps[attr] = members
+                _register_enum(attr, members)
 
 _load_group_enums()
 
@@ -45,127 +73,156 @@ def _load_symbol_enums(symbol):
                 if name.isupper()
             }
             if members:
-                _enum_maps[attr] = members
+                _register_enum(attr, members)
     _symbol_enums_loaded = True
 
 def _map_enum(enum_name: str, raw_value):
     """Turn raw_value into its enum name(s), or fall back to the number."""
-    members = _enum_maps.get(enum_name)
-    if members is None or raw_value is None:
+    names = _enum_names.get(enum_name)
+    if names is None or raw_value is None:
         return raw_value
     # 1) exact match?
-    for name, val in members.items():
-        if raw_value == val:
-            return name
-    # 2) flag-style (bitmask) – collect all that fit
-    flags = [
-        name for name, val in members.items()
-        if isinstance(val, int) and val != 0 and (raw_value & val) == val
-    ]
+    try:
+        name = names.get(raw_value)
+    except TypeError:
+        name = next((n for n, val in _enum_maps[enum_name].items() if raw_value == val), None)
+    if name is not None:
+        return name
+    if not isinstance(raw_value, int):
+        return raw_value
+    # 2) flag-style (bitmask) – collect all that fit, once per distinct value
+    key = (enum_name, raw_value)
+    flags = _flag_cache.get(key)
+    if flags is None:
+        flags = _flag_cache[key] = tuple(
+            name for name, val in _enum_flags[enum_name] if (raw_value & val) == val
+        )
     if flags:
-        return flags
+        return list(flags)
     return raw_value
 
+
+def _enum_properties(obj):
+    """[(property, enum_name)] for every known enum whose property `obj`'s class has."""
+    cls = type(obj)
+    props = _enum_props.get(cls)
+    if props is None:
+        props = _enum_props[cls] = [
+            (enum_name[2:], enum_name)       # drop "En"
+            for enum_name in _enum_maps
+            if hasattr(obj, enum_name[2:])
+        ]
+    return props
+
 # ———————————————————————————————————————————————
 # 2. Main function
 # ———————————————————————————————————————————————
 
-def get_group_configurations(identifier: str):
+def serialize_group(grp) -> dict:
+    """One group configuration with its commissions and symbols, enums decoded."""
+    # — Basic group info —
+    data = {
+        "group_name": getattr(grp, "Group", None),
+        "server_id":  getattr(grp, "Server", None),
+        "company":    getattr(grp, "Company", None),
+    }
+
+    # — Decode every group‐level enum (EnXYZ → XYZ) —
+    for prop, enum_name in _enum_properties(grp):
+        data[prop] = _map_enum(enum_name, getattr(grp, prop))
+
+    # — Commissions (unchanged) —
+    data["commissions"] = []
+    try:
+        ctot = grp.CommissionTotal()
+    except Exception:
+        ctot = 0
+    for i in range(ctot):
+        comm = grp.CommissionNext(i)
+        tiers = []
+        try:
+            ttot = comm.TierTotal()
+        except Exception:
+            ttot = 0
+        for j in range(ttot):
+            tier = comm.TierNext(j)
+            tiers.append({
+                "range_from": getattr(tier, "RangeFrom", None),
+                "range_to":   getattr(tier, "RangeTo",   None),
+                "value":      getattr(tier, "Value",     None),
+            })
+        data["commissions"].append({
+            "name": getattr(comm, "Name", None),
+            "tiers": tiers
+        })
+
+    # — Symbols + dynamic enum mapping —
+    data["symbols"] = []
+    try:
+        stot = grp.SymbolTotal()
+    except Exception:
+        stot = 0
+
+    for i in range(stot):
+        sym = grp.SymbolNext(i)
+
+        # load symbol enums once
+        _load_symbol_enums(sym)
+
+        # grab every public, non‐callable field
+        sym_data = to_dict(sym)
+
+        # map any enums on the symbol
+        for prop, enum_name in _enum_properties(sym):
+            if prop in sym_data:
+                sym_data[prop] = _map_enum(enum_name, sym_data[prop])
+
+        data["symbols"].append(sym_data)
+
+    return data
+
+
+def _load_all_groups(mgr):
+    groups = mgr.manager.GroupRequestArray()
+    if groups is None or groups is False:
+        raise LookupError("No groups found.")
+    return [serialize_group(grp) for grp in groups]
+
+
+def _load_group(mgr, name: str):
+    grp = mgr.manager.GroupRequest(name)
+    if not grp:
+        return None  # deleted since it was marked stale
+    return serialize_group(grp)
+
+
+def get_group_configurations_with_etag(identifier: str) -> Tuple[List[dict], str]:
     """
-    Retrieve group configurations using the active MT5 Manager connection
-    identified by 'identifier', with *all* enums decoded to names.
+    Group configurations plus their ETag, served from the manager's group
+    cache; only groups changed since the last call are re-serialized.
+    Raises LookupError for an unknown manager, ConnectionError if it is not
+    connected, and lets SDK failures propagate.
     """
     if identifier not in mt5_managers:
-        return {"error": f"Manager instance '{identifier}' not found."}
+        raise LookupError(f"Manager instance '{identifier}' not found.")
 
     mgr = mt5_managers[identifier]
-    if not mgr.connected and not mgr.connect():
-        return {"error": f"Failed to connect manager '{identifier}': {MT5Manager.LastError()}"}
+    if not mgr.connected:
+        raise ConnectionError(f"Manager '{identifier}' is {mgr.state}")
 
-    try:
-        groups = mgr.manager.GroupRequestArray()
-        if groups is None:
-            return {"error": "No groups found."}
-
-        result = []
-        for grp in groups:
-            # — Basic group info —
-            data = {
-                "group_name": getattr(grp, "Group", None),
-                "server_id":  getattr(grp, "Server", None),
-                "company":    getattr(grp, "Company", None),
-            }
+    return mgr.group_configs.get(
+        lambda: _load_all_groups(mgr),
+        lambda name: _load_group(mgr, name),
+    )
 
-            # — Decode every group‐level enum (EnXYZ → XYZ) —
-            for enum_name in list(_enum_maps):
-                prop = enum_name[2:]               # drop "En"
-                if hasattr(grp, prop):
-                    raw = getattr(grp, prop)
-                    data[prop] = _map_enum(enum_name, raw)
-
-            # — Commissions (unchanged) —
-            data["commissions"] = []
-            try:
-                ctot = grp.CommissionTotal()
-            except Exception:
-                ctot = 0
-            for i in range(ctot):
-                comm = grp.CommissionNext(i)
-                tiers = []
-                try:
-                    ttot = comm.TierTotal()
-                except Exception:
-                    ttot = 0
-                for j in range(ttot):
-                    tier = comm.TierNext(j)
-                    tiers.append({
-                        "range_from": getattr(tier, "RangeFrom", None),
-                        "range_to":   getattr(tier, "RangeTo",   None),
-                        "value":      getattr(tier, "Value",     None),
-                    })
-                data["commissions"].append({
-                    "name": getattr(comm, "Name", None),
-                    "tiers": tiers
-                })
-
-            # — Symbols + dynamic enum mapping —
-            data["symbols"] = []
-            try:
-                stot = grp.SymbolTotal()
-            except Exception:
-                stot = 0
-
-            for i in range(stot):
-                sym = grp.SymbolNext(i)
-
-                # load symbol enums once
-                _load_symbol_enums(sym)
-
-                # grab every public, non‐callable field
-                fields = [
-                    a for a in dir(sym)
-                    if not a.startswith("_")
-                    and not callable(getattr(sym, a, None))
-                ]
-                sym_data = {}
-                for f in fields:
-                    try:
-                        sym_data[f] = getattr(sym, f)
-                    except Exception:
-                        sym_data[f] = None
-
-                # map any enums on the symbol
-                for enum_name in list(_enum_maps):
-                    prop = enum_name[2:]
-                    if prop in sym_data:
-                        sym_data[prop] = _map_enum(enum_name, sym_data[prop])
-
-                data["symbols"].append(sym_data)
-
-            result.append(data)
-
-        return result
 
+def get_group_configurations(identifier: str):
+    """
+    Retrieve group configurations using the active MT5 Manager connection
+    identified by 'identifier', with *all* enums decoded to names.
+    Returns {"error": ...} on failure.
+    """
+    try:
+        return get_group_configurations_with_etag(identifier)[0]
     except Exception as e:
-        # you could also raise HTTPException(500, detail=str(e)) here
         return {"error": str(e)}
@@ -0,0 +1,152 @@
+# app/modules/mt5_manager/history.py
+
+import asyncio
+import datetime
+import logging
+import os
+from collections import deque
+from typing import Any, AsyncIterator, Callable, Deque, Dict, List, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Width of one time slice, how many slices run at once per request, and how
+# many times a failed slice is retried on its own (timeouts are not retried).
+HISTORY_SLICE_HOURS = float(os.getenv("MT5_HISTORY_SLICE_HOURS", "24"))
+HISTORY_CONCURRENCY = int(os.getenv("MT5_HISTORY_CONCURRENCY", "3"))
+HISTORY_RETRIES = int(os.getenv("MT5_HISTORY_RETRIES", "2"))
+
+
+def split_range(
+    date_from: datetime.datetime,
+    date_to: datetime.datetime,
+    slice_hours: float = HISTORY_SLICE_HOURS,
+) -> List[Tuple[datetime.datetime, datetime.datetime]]:
+    """Cut [date_from, date_to] into consecutive inclusive slices that do not overlap."""
+    step = datetime.timedelta(hours=slice_hours)
+    second = datetime.timedelta(seconds=1)
+    slices = []
+    start = date_from
+    while start <= date_to:
+        end = min(start + step - second, date_to)
+        slices.append((start, end))
+        start = end + second
+    return slices
+
+
+def split_groups(groups: str) -> List[str]:
+    """
+    Split a comma-separated group list into separately fetchable masks.
+    Lists with exclusions ("!mask") only make sense as a whole and are kept together.
+    """
+    parts = [g.strip() for g in groups.split(",") if g.strip()]
+    if len(parts) <= 1 or any(p.startswith("!") for p in parts):
+        return [groups]
+    return parts
+
+
+async def _fetch_piece(svc, request, key, a, b, semaphore: asyncio.Semaphore, retries: int) -> List[Dict]:
+    for attempt in range(retries + 1):
+        async with semaphore:
+            try:
+                return await svc.run(request, key, a, b, timeout=svc.HISTORY_TIMEOUT)
+            except asyncio.TimeoutError:
+                # the timed-out call still holds an executor worker: retrying would stack another
+                raise
+            except Exception as e:
+                if attempt == retries:
+                    raise
+                logger.warning(
+                    f"History slice {key!r} {a.isoformat()}..{b.isoformat()} failed "
+                    f"(attempt {attempt + 1}/{retries + 1}): {repr(e)}"
+                )
+        await asyncio.sleep(0.5 * 2 ** attempt)
+
+
+async def _gather_pieces(coros) -> List[List[Dict]]:
+    """asyncio.gather that cancels the outstanding pieces as soon as one fails for good."""
+    tasks = [asyncio.ensure_future(c) for c in coros]
+    try:
+        return list(await asyncio.gather(*tasks))
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+def _merge(results: List[List[Dict]]) -> List[Dict]:
+    """De-duplicate by ticket and order by time."""
+    if len(results) == 1:
+        return results[0]
+    merged: Dict[Any, Dict] = {}
+    for chunk in results:
+        for deal in chunk:
+            merged.setdefault(deal["ticket"], deal)
+    return sorted(merged.values(), key=_time_order)
+
+
+async def fetch_sliced(
+    svc,
+    request: Callable[[Any, datetime.datetime, datetime.datetime], List[Dict]],
+    date_from: datetime.datetime,
+    date_to: datetime.datetime,
+    keys: Sequence[Any] = (None,),
+    concurrency: int = HISTORY_CONCURRENCY,
+    retries: int = HISTORY_RETRIES,
+) -> List[Dict]:
+    """
+    Fetch history as (key × time slice) pieces on the manager's executor.
+
+    `request(key, slice_from, slice_to)` is a blocking, parsed DealRequest*
+    call, where key is e.g. one group mask. At most `concurrency` pieces run
+    at once, a failing piece is retried on its own up to `retries` times
+    (a timed-out one is not, its call is still running), and the results are de-duplicated by ticket and merged in time order.
+    """
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    pieces = [(key, a, b) for key in keys for a, b in split_range(date_from, date_to)]
+    results = await _gather_pieces(
+        _fetch_piece(svc, request, key, a, b, semaphore, retries) for key, a, b in pieces
+    )
+    return _merge(results)
+
+
+async def iter_sliced(
+    svc,
+    request: Callable[[Any, datetime.datetime, datetime.datetime], List[Dict]],
+    date_from: datetime.datetime,
+    date_to: datetime.datetime,
+    keys: Sequence[Any] = (None,),
+    concurrency: int = HISTORY_CONCURRENCY,
+    retries: int = HISTORY_RETRIES,
+) -> AsyncIterator[List[Dict]]:
+    """
+    Streaming `fetch_sliced`: yields one merged time slice at a time, in
+    order. Only `concurrency` time slices are fetched ahead, so memory
+    stays bounded however long the range is.
+    """
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def fetch_slice(a, b) -> List[Dict]:
+        results = await _gather_pieces(_fetch_piece(svc, request, key, a, b, semaphore, retries) for key in keys)
+        return _merge(results)
+
+    slices = iter(split_range(date_from, date_to))
+    pending: Deque[asyncio.Task] = deque()
+    try:
+        while True:
+            while len(pending) < max(1, concurrency):
+                bounds = next(slices, None)
+                if bounds is None:
+                    break
+                pending.append(asyncio.ensure_future(fetch_slice(*bounds)))
+            if not pending:
+                return
+            yield await pending.popleft()
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+def _time_order(deal: Dict) -> Tuple:
+    t = deal.get("time")
+    if isinstance(t, datetime.datetime):
+        t = t.timestamp()
+    return (t or 0, deal.get("ticket") or 0)
@@ -0,0 +1,158 @@
+# app/modules/mt5_manager/ingest.py
+
+import logging
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class StageTimer:
+    """Count / total / max latency accumulator for one pipeline stage."""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds: float):
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def as_dict(self) -> Dict[str, float]:
+        return {
+            "count": self.count,
+            "avg_ms": round(self.total / self.count * 1000, 3) if self.count else 0.0,
+            "max_ms": round(self.max * 1000, 3),
+        }
+
+
+class DealIngestPipeline:
+    """
+    Moves deal processing off the MT5 pump thread.
+
+    SDK callbacks only `submit()` the raw deal object. A worker thread takes
+    micro-batches of up to `batch_size` deals, waiting at most `linger`
+    seconds for a batch to fill, parses them with `parse` and hands the
+    parsed list to `publish` in one call.
+
+    Deals submitted with op "update" or "delete" go through the same queue,
+    so they stay ordered with the adds, and are handed to `amend(op, deals)`
+    instead of `publish`.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        parse: Callable[[Any], Dict],
+        publish: Callable[[List[Dict]], None],
+        batch_size: int = 256,
+        linger: float = 0.005,
+        amend: Optional[Callable[[str, List[Dict]], None]] = None,
+    ):
+        self.name = name
+        self.parse = parse
+        self.publish = publish
+        self.amend = amend
+        self.batch_size = batch_size
+        self.linger = linger
+        self._queue: "queue.SimpleQueue" = queue.SimpleQueue()
+        self._thread = None
+        self._stopping = False
+        self.received = 0
+        self.published = 0
+        self.failed = 0
+        self.batches = 0
+        self.queue_wait = StageTimer()
+        self.parse_time = StageTimer()
+        self.publish_time = StageTimer()
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stopping = False
+        self._thread = threading.Thread(target=self._run, name=f"deal-ingest:{self.name}", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopping = True
+        self._queue.put(None)
+
+    def submit(self, deal: Any, op: str = "add"):
+        """Called on the SDK callback thread: enqueue only."""
+        self.received += 1
+        self._queue.put((time.perf_counter(), op, deal))
+
+    def _next_batch(self) -> list:
+        first = self._queue.get()
+        batch = [first]
+        deadline = time.perf_counter() + self.linger
+        while first is not None and len(batch) < self.batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            batch.append(item)
+            if item is None:
+                break
+        return batch
+
+    def _run(self):
+        logger.info(f"✅ Deal ingest worker started: {self.name}")
+        while not self._stopping:
+            batch = [item for item in self._next_batch() if item is not None]
+            if not batch:
+                continue
+
+            started = time.perf_counter()
+            for enqueued, _, _ in batch:
+                self.queue_wait.add(started - enqueued)
+
+            # consecutive runs of the same op, in arrival order
+            runs = []
+            for _, op, deal in batch:
+                try:
+                    parsed = self.parse(deal)
+                except Exception as e:
+                    self.failed += 1
+                    logger.error(f"{self.name}: failed to parse deal: {repr(e)}")
+                    continue
+                if runs and runs[-1][0] == op:
+                    runs[-1][1].append(parsed)
+                else:
+                    runs.append((op, [parsed]))
+            parsed_at = time.perf_counter()
+            self.parse_time.add(parsed_at - started)
+
+            for op, deals in runs:
+                try:
+                    if op == "add":
+                        self.publish(deals)
+                    elif self.amend is not None:
+                        self.amend(op, deals)
+                    self.published += len(deals)
+                except Exception as e:
+                    self.failed += len(deals)
+                    logger.error(f"{self.name}: failed to {op} deals: {repr(e)}")
+            self.publish_time.add(time.perf_counter() - parsed_at)
+            self.batches += 1
+        logger.info(f"Deal ingest worker stopped: {self.name}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "queue_depth": self._queue.qsize(),
+            "received": self.received,
+            "published": self.published,
+            "failed": self.failed,
+            "batches": self.batches,
+            "batch_size": self.batch_size,
+            "linger_ms": self.linger * 1000,
+            "queue_wait": self.queue_wait.as_dict(),
+            "parse": self.parse_time.as_dict(),
+            "publish": self.publish_time.as_dict(),
+        }
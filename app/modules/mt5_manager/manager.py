@@ -1,11 +1,23 @@
 import MT5Manager
 import logging
 import asyncio
+import functools
+import os
 import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from fastapi import WebSocket
-from typing import Dict, List
+from typing import Dict, List, Optional, Tuple
 from app.modules.database import SessionLocal, MT5Group
+from app.modules.mt5_manager.deal_store import DEAL_STORE_ENABLED, DealStore
 from app.modules.mt5_manager.deals_mapping import parse_deal
+from app.modules.mt5_manager.group_cache import GroupConfigCache
+from app.modules.mt5_manager.ingest import DealIngestPipeline
+from app.modules.mt5_manager.positions import PositionBook, coalesce_changes, parse_position
+from app.modules.mt5_manager.serializers import to_dict, to_dicts
+from app.modules.mt5_manager.streams import Broadcaster, SequencedRing, drain
+from app.modules.mt5_manager.symbol_cache import SymbolCache
+from app.modules.mt5_manager.user_directory import UserDirectory
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.DEBUG)  # Enable detailed logging
@@ -13,41 +25,165 @@ logger.setLevel(logging.DEBUG)  # Enable detailed logging
 # ✅ Global storage for multiple MT5Manager instances
 mt5_managers: Dict[str, "MT5ManagerService"] = {}
 
+# ✅ Credentials of sessions evicted for idleness, so they can be restored on next use
+evicted_sessions: Dict[str, Tuple[str, int, str]] = {}
+
 class MT5ManagerService:
     class DealSink:
         def __init__(self, service: "MT5ManagerService"):
             self.service = service
 
+        # Callbacks run on the MT5 pump thread: keep them to a queue put.
         def OnDealAdd(self, deal):
-            deal_str = deal.Print() if hasattr(deal, "Print") else str(deal)
-            logger.info(f"OnDealAdd: {deal_str}")
-            deal_info = parse_deal(deal)
-            self.service.latest_deals.append(deal_info)
-            logger.debug(f"Deal stored: {deal_info}")
+            self.service.deal_ingest.submit(deal)
 
         def OnDealUpdate(self, deal):
-            deal_str = deal.Print() if hasattr(deal, "Print") else str(deal)
-            logger.info(f"OnDealUpdate: {deal_str}")
+            self.service.deal_ingest.submit(deal, op="update")
 
         def OnDealDelete(self, deal):
-            deal_str = deal.Print() if hasattr(deal, "Print") else str(deal)
-            logger.info(f"OnDealDelete: {deal_str}")
+            self.service.deal_ingest.submit(deal, op="delete")
 
         def OnDealClear(self, deal):
-            deal_str = deal.Print() if hasattr(deal, "Print") else str(deal)
-            logger.info(f"OnDealClear: {deal_str}")
+            logger.debug(f"OnDealClear: {getattr(deal, 'Deal', None)}")
 
         def OnDealSync(self, deal):
-            deal_str = deal.Print() if hasattr(deal, "Print") else str(deal)
-            logger.info(f"OnDealSync: {deal_str}")
+            logger.debug(f"OnDealSync: {getattr(deal, 'Deal', None)}")
 
         def OnDealPerform(self, deal):
-            deal_str = deal.Print() if hasattr(deal, "Print") else str(deal)
-            logger.info(f"OnDealPerform: {deal_str}")
+            logger.debug(f"OnDealPerform: {getattr(deal, 'Deal', None)}")
 
         def OnDealPerformCloseBy(self, deal):
-            deal_str = deal.Print() if hasattr(deal, "Print") else str(deal)
-            logger.info(f"OnDealPerformCloseBy: {deal_str}")
+            logger.debug(f"OnDealPerformCloseBy: {getattr(deal, 'Deal', None)}")
+
+    class PositionSink:
+        """Keeps the service's PositionBook in step with the positions pump."""
+        def __init__(self, service: "MT5ManagerService"):
+            self.service = service
+
+        def OnPositionAdd(self, position):
+            self.service.position_book.upsert(parse_position(position))
+
+        def OnPositionUpdate(self, position):
+            self.service.position_book.upsert(parse_position(position))
+
+        def OnPositionDelete(self, position):
+            self.service.position_book.remove(parse_position(position)["ticket"])
+
+        def OnPositionClean(self, login):
+            self.service.position_book.remove_login(login)
+
+        def OnPositionSync(self):
+            # runs on the pump thread: no server round trip here, the supervisor reloads the book
+            logger.debug(f"OnPositionSync: position book of {self.service.identifier} will be reloaded")
+            self.service.request_position_reload()
+
+    class GroupSink:
+        """Marks cached group configurations stale as the server reports changes."""
+        def __init__(self, service: "MT5ManagerService"):
+            self.service = service
+
+        def OnGroupAdd(self, group):
+            self.service.group_configs.invalidate(getattr(group, "Group", None))
+
+        def OnGroupUpdate(self, group):
+            self.service.group_configs.invalidate(getattr(group, "Group", None))
+
+        def OnGroupDelete(self, group):
+            self.service.group_configs.invalidate(getattr(group, "Group", None))
+
+        def OnGroupSync(self):
+            logger.debug(f"OnGroupSync: invalidating group configurations of {self.service.identifier}")
+            self.service.group_configs.invalidate()
+
+    class SymbolSink:
+        """Keeps the service's SymbolCache in step with symbol configuration changes."""
+        def __init__(self, service: "MT5ManagerService"):
+            self.service = service
+
+        def OnSymbolAdd(self, symbol):
+            self.service.symbol_cache.upsert(to_dict(symbol))
+
+        def OnSymbolUpdate(self, symbol):
+            self.service.symbol_cache.upsert(to_dict(symbol))
+
+        def OnSymbolDelete(self, symbol):
+            self.service.symbol_cache.remove(getattr(symbol, "Symbol", None))
+
+        def OnSymbolSync(self):
+            logger.debug(f"OnSymbolSync: symbol cache of {self.service.identifier} will be reloaded")
+            self.service.symbol_cache.invalidate()
+
+    class UserSink:
+        """Keeps the service's UserDirectory in step with the users pump."""
+        def __init__(self, service: "MT5ManagerService"):
+            self.service = service
+
+        def OnUserAdd(self, user):
+            self.service.user_directory.upsert(to_dict(user))
+
+        def OnUserUpdate(self, user):
+            self.service.user_directory.upsert(to_dict(user))
+
+        def OnUserDelete(self, user):
+            self.service.user_directory.remove(getattr(user, "Login", None))
+
+        def OnUserClean(self, login):
+            self.service.user_directory.remove(login)
+
+        def OnUserSync(self):
+            logger.debug(f"OnUserSync: user directory of {self.service.identifier} will be reloaded")
+            self.service.user_directory.invalidate()
+
+    class ManagerSink:
+        """Connection-state callbacks of the ManagerAPI; wakes the supervisor on a drop."""
+        def __init__(self, service: "MT5ManagerService"):
+            self.service = service
+
+        def OnConnect(self):
+            logger.info(f"OnConnect: {self.service.identifier}")
+
+        def OnDisconnect(self):
+            logger.warning(f"OnDisconnect: {self.service.identifier}")
+            self.service.mark_disconnected("server dropped the connection")
+
+    # Pumps requested on Connect: positions feed the PositionBook, users the UserDirectory,
+    # groups and symbols the sinks keeping the group-configuration and symbol caches current
+    PUMP_MODES = (
+        MT5Manager.ManagerAPI.EnPumpModes.PUMP_MODE_POSITIONS
+        | MT5Manager.ManagerAPI.EnPumpModes.PUMP_MODE_USERS
+        | MT5Manager.ManagerAPI.EnPumpModes.PUMP_MODE_GROUPS
+        | MT5Manager.ManagerAPI.EnPumpModes.PUMP_MODE_SYMBOLS
+    )
+
+    # Worker threads per manager for blocking SDK calls, and call timeouts (s)
+    EXECUTOR_WORKERS = 4
+    CALL_TIMEOUT = 60.0
+    CONNECT_TIMEOUT = 125.0
+    HISTORY_TIMEOUT = 300.0
+
+    # Supervisor: reconnect backoff bounds, health probe interval and timeout (s)
+    RECONNECT_MIN_DELAY = 1.0
+    RECONNECT_MAX_DELAY = 60.0
+    HEALTH_CHECK_INTERVAL = 15.0
+    HEALTH_CHECK_TIMEOUT = 10.0
+
+    # Interval (s) between incremental syncs of the local deal store
+    DEAL_SYNC_INTERVAL = 60.0
+
+    # Deal ingest micro-batching: max deals per batch / max wait for a batch to fill (s)
+    DEAL_BATCH_SIZE = int(os.getenv("MT5_DEAL_BATCH_SIZE", "256"))
+    DEAL_BATCH_LINGER = float(os.getenv("MT5_DEAL_BATCH_LINGER", "0.005"))
+
+    # Number of recent deals kept for /latest and websocket resume (?since=)
+    DEAL_BUFFER_SIZE = 10000
+
+    # Fallback lifetime (s) of cached group configurations between change notifications
+    GROUP_CONFIG_TTL = 300.0
+
+    # Minimum delay between two full-list pushes on the positions websocket
+    POSITIONS_PUSH_INTERVAL = 1.0
+    # Minimum delay between two delta messages in "delta" stream mode
+    POSITIONS_DELTA_INTERVAL = 0.25
 
     def __init__(self, identifier: str, server: str, login: int, password: str):
         self.identifier = identifier  # Unique ID for each manager
@@ -56,11 +192,53 @@ class MT5ManagerService:
         self.password = password
         self.manager = MT5Manager.ManagerAPI()
         self.connected = False
+        self.last_used = time.monotonic()
+        self.in_flight = 0  # run() calls currently executing or queued
+        self.pinned = False  # exempt from idle eviction (sessions configured at startup)
+        self.state = "disconnected"  # disconnected / connecting / connected / reconnecting / closed
+        self.last_error: Optional[str] = None
+        self.manager_sink = self.ManagerSink(self)
+        self._manager_subscribed = False
+        self._positions_subscribed = False
+        self._groups_subscribed = False
+        self._symbols_subscribed = False
+        self._users_subscribed = False
+        self.deals_subscribed = False
+        self._positions_stale = False
+        self._feeds_stale = False
+        self._supervisor: Optional[asyncio.Task] = None
+        self._deal_sync: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._attempted: Optional[asyncio.Event] = None
         self.deals_subscribers: List[WebSocket] = []
         self.positions_subscribers: List[WebSocket] = []
         self.thread = None
-        self.latest_deals: List[Dict] = []  # Storage for incoming deals
+        self.executor = ThreadPoolExecutor(max_workers=self.EXECUTOR_WORKERS, thread_name_prefix=f"mt5-{identifier}")
+        # Supervisor calls (connect, probe, disconnect) get their own thread so that
+        # history slices or store syncs saturating `executor` cannot fail a probe
+        self.control_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"mt5-{identifier}-ctl")
+        self.deal_log = SequencedRing(self.DEAL_BUFFER_SIZE)  # Recent deals, sequence-numbered
+        self.deal_store = DealStore(identifier, server, login) if DEAL_STORE_ENABLED else None  # Local deal history
         self.deals_sink = self.DealSink(self)
+        self.deals_hub = Broadcaster(f"deals:{identifier}")
+        self.deal_ingest = DealIngestPipeline(
+            identifier,
+            parse=parse_deal,
+            publish=self.publish_deals,
+            batch_size=self.DEAL_BATCH_SIZE,
+            linger=self.DEAL_BATCH_LINGER,
+            amend=self.amend_deals,
+        )
+        self.positions_hub = Broadcaster(f"positions:{identifier}")
+        self.position_book = PositionBook(on_change=lambda *change: self.positions_hub.publish(change))
+        self.positions_sink = self.PositionSink(self)
+        self.group_configs = GroupConfigCache(identifier, ttl=self.GROUP_CONFIG_TTL)
+        self.groups_sink = self.GroupSink(self)
+        self.symbol_cache = SymbolCache()
+        self.symbols_sink = self.SymbolSink(self)
+        self.user_directory = UserDirectory()
+        self.users_sink = self.UserSink(self)
 
     def connect(self) -> bool:
         """Connect to MT5 Manager if not already connected, and wait for the connection result."""
@@ -75,23 +253,41 @@ class MT5ManagerService:
         # else:
         #     logger.info("✅ Subscribed to deals successfully before connecting.")
 
+        # A Connect that outlived its wait may still be blocked on this ManagerAPI:
+        # wait for that one instead of calling Connect again on top of it
+        if self.connecting:
+            logger.warning(f"Previous Connect of {self.identifier} still running, waiting for it")
+            self.thread.join(timeout=120)
+            return self.connected
+
+        if not self._manager_subscribed:
+            self._manager_subscribed = bool(self.manager.Subscribe(self.manager_sink))
+
         # Use an event to signal when connection is done
         connection_event = threading.Event()
 
         def run_connection():
             logger.debug(f"Starting connection: {self.identifier}")
-            if self.manager.Connect(
-                    self.server,
-                    self.login,
-                    self.password,
-                    MT5Manager.ManagerAPI.EnPumpModes.PUMP_MODE_POSITIONS,
-                    120000,
-            ):
-                self.connected = True
-                logger.info(f"✅ Connected: {self.identifier}")
-            else:
-                logger.error(f"⚠️ Failed to connect {self.identifier}: {MT5Manager.LastError()}")
-            connection_event.set()  # Signal that connection attempt is complete
+            try:
+                if not self.manager.Connect(
+                        self.server,
+                        self.login,
+                        self.password,
+                        self.PUMP_MODES,
+                        120000,
+                ):
+                    self.last_error = str(MT5Manager.LastError())
+                    logger.error(f"⚠️ Failed to connect {self.identifier}: {self.last_error}")
+                elif self.state == "closed":
+                    # closed while Connect was blocked: nothing owns this connection any more
+                    self.manager.Disconnect()
+                else:
+                    # sinks and caches are set up by the supervisor (start_feeds)
+                    self._feeds_stale = True
+                    self.connected = True
+                    logger.info(f"✅ Connected: {self.identifier}")
+            finally:
+                connection_event.set()  # Signal that connection attempt is complete
 
         # Start connection in a separate thread
         self.thread = threading.Thread(target=run_connection)
@@ -109,6 +305,173 @@ class MT5ManagerService:
         self.thread.start()
         return True
 
+    def touch(self):
+        """Mark the session as used now (LRU eviction order)."""
+        self.last_used = time.monotonic()
+
+    @property
+    def has_subscribers(self) -> bool:
+        return bool(
+            self.deals_subscribers or self.positions_subscribers
+            or self.deals_hub.subscriber_count or self.positions_hub.subscriber_count
+        )
+
+    @property
+    def connecting(self) -> bool:
+        """A Connect call is still running on its connection thread."""
+        return self.thread is not None and self.thread.is_alive()
+
+    @property
+    def busy(self) -> bool:
+        """Subscribers attached, SDK calls in flight or a (re)connect under way: not safe to evict."""
+        return (
+            self.has_subscribers or self.in_flight > 0 or self.connecting
+            or self.state in ("connecting", "reconnecting")
+        )
+
+    # ——— Connection supervisor ———
+
+    @property
+    def supervised(self) -> bool:
+        return self._supervisor is not None and not self._supervisor.done()
+
+    def start_supervisor(self):
+        """Keep this manager connected in the background. Must be called from the event loop."""
+        if self.supervised:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        self._attempted = asyncio.Event()
+        self._supervisor = self._loop.create_task(self._supervise())
+        if self.deal_store is not None:
+            self._deal_sync = self._loop.create_task(self._sync_deal_store())
+
+    async def stop_supervisor(self):
+        if self._deal_sync is not None:
+            self._deal_sync.cancel()
+            self._deal_sync = None
+        if self._supervisor is None:
+            return
+        self._supervisor.cancel()
+        try:
+            await self._supervisor
+        except asyncio.CancelledError:
+            pass
+        self._supervisor = None
+
+    async def wait_first_attempt(self, timeout: float) -> bool:
+        """Wait until the supervisor has finished at least one connection attempt."""
+        try:
+            await asyncio.wait_for(self._attempted.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        return self.connected
+
+    def mark_disconnected(self, reason: str):
+        """Thread-safe: flag the connection as lost and wake the supervisor."""
+        if self.state == "closed":
+            return
+        self.connected = False
+        self.state = "reconnecting"
+        self.last_error = reason
+        loop, wake = self._loop, self._wake
+        if loop is not None and wake is not None:
+            try:
+                loop.call_soon_threadsafe(wake.set)
+            except RuntimeError:
+                pass
+
+    def request_position_reload(self):
+        """Thread-safe: mark the position book stale and wake the supervisor to reload it."""
+        self._positions_stale = True
+        loop, wake = self._loop, self._wake
+        if loop is not None and wake is not None:
+            try:
+                loop.call_soon_threadsafe(wake.set)
+            except RuntimeError:
+                pass
+
+    def probe(self) -> bool:
+        """Blocking health probe: a cheap server round trip."""
+        try:
+            return bool(self.manager.TimeServer())
+        except Exception as e:
+            logger.warning(f"Health probe raised for {self.identifier}: {repr(e)}")
+            return False
+
+    async def _sleep_or_wake(self, seconds: float):
+        try:
+            await asyncio.wait_for(self._wake.wait(), seconds)
+        except asyncio.TimeoutError:
+            pass
+        self._wake.clear()
+
+    async def _supervise(self):
+        delay = self.RECONNECT_MIN_DELAY
+        logger.info(f"✅ Supervisor started for {self.identifier}")
+        while True:
+            if self.connected:
+                # also covers a Connect that completed after its attempt had timed out
+                self.state = "connected"
+                self.last_error = None
+                delay = self.RECONNECT_MIN_DELAY
+                if self._feeds_stale:
+                    try:
+                        await self.run(self.start_feeds, timeout=self.CONNECT_TIMEOUT)
+                    except Exception as e:
+                        self._feeds_stale = True
+                        logger.error(f"Subscribing feeds failed for {self.identifier}: {repr(e)}")
+            else:
+                if self.state != "reconnecting":
+                    self.state = "connecting"
+                try:
+                    ok = await self._run_control(self.connect, self.CONNECT_TIMEOUT)
+                except Exception as e:
+                    self.last_error = repr(e)
+                    ok = False
+                self._attempted.set()
+                if ok:
+                    continue  # recorded as connected at the top of the loop
+                self.state = "reconnecting"
+                logger.warning(f"Reconnect of {self.identifier} failed, retrying in {delay:.0f}s: {self.last_error}")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self.RECONNECT_MAX_DELAY)
+                continue
+
+            await self._sleep_or_wake(self.HEALTH_CHECK_INTERVAL)
+            if not self.connected:
+                continue
+            if self._positions_stale:
+                try:
+                    await self.run(self.load_position_book)
+                except Exception as e:
+                    self._positions_stale = True
+                    logger.error(f"Position book reload failed for {self.identifier}: {repr(e)}")
+            try:
+                healthy = await self._run_control(self.probe, self.HEALTH_CHECK_TIMEOUT)
+            except Exception:
+                healthy = False
+            if not healthy:
+                logger.warning(f"⚠️ Health probe failed for {self.identifier}, reconnecting")
+                self.mark_disconnected("health probe failed")
+                try:
+                    await self._run_control(self.manager.Disconnect, self.CALL_TIMEOUT)
+                except Exception as e:
+                    logger.error(f"Disconnect of {self.identifier} after failed probe raised: {repr(e)}")
+
+    async def _sync_deal_store(self):
+        """Pull new deals into the local deal store while connected, a few slices per call."""
+        while True:
+            while self.connected:
+                try:
+                    stored = await self.run(self.deal_store.sync_once, self.manager, timeout=self.HISTORY_TIMEOUT)
+                except Exception as e:
+                    logger.error(f"Deal store sync error for {self.identifier}: {repr(e)}")
+                    break
+                if stored is None or not self.deal_store.behind:
+                    break
+            await asyncio.sleep(self.DEAL_SYNC_INTERVAL)
+
     def disconnect(self) -> bool:
         """Disconnect MT5 Manager."""
         if not self.connected:
@@ -121,6 +484,40 @@ class MT5ManagerService:
         logger.info(f"✅ {self.identifier} disconnected.")
         return True
 
+    async def run(self, fn, *args, timeout: Optional[float] = None, **kwargs):
+        """
+        Run a blocking SDK call on this manager's own executor and await it.
+        Raises asyncio.TimeoutError after `timeout` seconds (CALL_TIMEOUT by
+        default); a call that has not started yet is cancelled with it.
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(self.executor, functools.partial(fn, *args, **kwargs))
+        self.in_flight += 1
+        try:
+            return await asyncio.wait_for(future, timeout or self.CALL_TIMEOUT)
+        finally:
+            self.in_flight -= 1
+
+    async def _run_control(self, fn, timeout: float):
+        """Like run(), on the supervisor's dedicated thread: the timeout covers only the call."""
+        loop = asyncio.get_running_loop()
+        return await asyncio.wait_for(loop.run_in_executor(self.control_executor, fn), timeout)
+
+    def close(self):
+        """Disconnect and release the worker threads of this manager."""
+        self.state = "closed"
+        # let a Connect still in flight finish, so Disconnect below releases what it opened
+        if self.connecting:
+            self.thread.join(timeout=120)
+        success = self.connected
+        self.manager.Disconnect()
+        self.connected = False
+        logger.info(f"✅ {self.identifier} closed.")
+        self.deal_ingest.stop()
+        self.executor.shutdown(wait=False)
+        self.control_executor.shutdown(wait=False)
+        return success
+
     def get_groups(self):
         """Retrieve all groups from MT5 Manager and store in SQLite."""
         if not self.connected:
@@ -154,14 +551,22 @@ class MT5ManagerService:
 
         return {"error": "No groups found."}
 
-    async def subscribe_to_deals(self, websocket: WebSocket):
+    async def subscribe_to_deals(self, websocket: WebSocket, since: Optional[int] = None):
         """
         WebSocket handler for live deals streaming.
         This method subscribes to deals only when the subscribe endpoint is hit.
+        With `since`, deals after that sequence number still held in the deal
+        buffer are replayed before the live stream continues.
         """
         # Subscribe to deals only if not already subscribed
         if not getattr(self, "deals_subscribed", False):
-            if not self.manager.DealSubscribe(self.deals_sink):
+            self.deal_ingest.start()
+            try:
+                subscribed = await self.run(self.manager.DealSubscribe, self.deals_sink)
+            except Exception as e:
+                logger.error(f"DealSubscribe raised for {self.identifier}: {repr(e)}")
+                subscribed = False
+            if not subscribed:
                 logger.error(f"Failed to subscribe to deals: {MT5Manager.LastError()}")
                 await websocket.close(code=1011)  # Close connection on failure
                 return
@@ -169,84 +574,295 @@ class MT5ManagerService:
                 logger.info("✅ Subscribed to deals successfully via subscribe endpoint.")
                 self.deals_subscribed = True
 
+        queue = self.deals_hub.subscribe()
         self.deals_subscribers.append(websocket)
+        reader = asyncio.create_task(self._wait_for_close(websocket))
         logger.info("✅ New WebSocket client connected for live deals.")
 
         try:
+            last_seq = 0
+            if since is not None:
+                missed, truncated = self.deal_log.since(since)
+                if missed:
+                    last_seq = missed[-1][0]
+                elif not truncated:
+                    last_seq = max(since, 0)
+                # else: `since` predates a buffer reset, resume from 0
+                await websocket.send_json({
+                    "deals": [deal for _, deal in missed],
+                    "seq": last_seq,
+                    "replay": True,
+                    "truncated": truncated,
+                })
+
             while True:
-                deals = self.get_latest_deals()
-                if deals:
-                    logger.debug(f"Sending deals: {deals}")
-                    try:
-                        await websocket.send_json({"deals": deals})
-                    except Exception as send_err:
-                        logger.error(f"Error sending deals: {repr(send_err)}")
-                        break
-                await asyncio.sleep(1)
+                first = await self._next_or_closed(queue, reader)
+                if first is None:
+                    break
+                # skip anything already covered by the replay
+                batch = [
+                    (seq, deal)
+                    for published in drain(queue, first)
+                    for seq, deal in published
+                    if seq > last_seq
+                ]
+                if not batch:
+                    continue
+                last_seq = batch[-1][0]
+                deals = [deal for _, deal in batch]
+                logger.debug(f"Sending deals: {deals}")
+                try:
+                    await websocket.send_json({"deals": deals, "seq": last_seq})
+                except Exception as send_err:
+                    logger.error(f"Error sending deals: {repr(send_err)}")
+                    break
         except Exception as e:
             logger.error(f"WebSocket error: {repr(e)}")
         finally:
+            reader.cancel()
+            self.touch()
+            self.deals_hub.unsubscribe(queue)
             if websocket in self.deals_subscribers:
                 self.deals_subscribers.remove(websocket)
             logger.info("WebSocket client disconnected from deals stream.")
 
     async def subscribe_to_positions(self, websocket: WebSocket):
-        """WebSocket handler for live positions streaming."""
-        await websocket.accept()
+        """
+        WebSocket handler for live positions streaming.
+        Pushes the full position list from the in-memory book whenever it changes.
+        """
+        queue = self.positions_hub.subscribe()
         self.positions_subscribers.append(websocket)
+        reader = asyncio.create_task(self._wait_for_close(websocket))
         logger.info(f"✅ WebSocket client connected for live positions on {self.identifier}.")
 
         try:
+            positions = self.get_latest_positions()
             while True:
+                logger.debug(f"Sending {len(positions)} positions")
+                try:
+                    await websocket.send_json({"positions": positions})
+                except Exception as send_err:
+                    logger.error(f"Error sending positions: {str(send_err)}")
+                    break
+                await asyncio.sleep(self.POSITIONS_PUSH_INTERVAL)
+                first = await self._next_or_closed(queue, reader)
+                if first is None:
+                    break
+                drain(queue, first)
                 positions = self.get_latest_positions()
-                if positions:
-                    logger.debug(f"Sending positions: {positions}")
-                    try:
-                        await websocket.send_json({"positions": positions})
-                    except Exception as send_err:
-                        logger.error(f"Error sending positions: {str(send_err)}")
-                        break
-                await asyncio.sleep(1)
         except Exception as e:
             logger.error(f"WebSocket error: {str(e)}")
         finally:
+            reader.cancel()
+            self.touch()
+            self.positions_hub.unsubscribe(queue)
             if websocket in self.positions_subscribers:
                 self.positions_subscribers.remove(websocket)
             logger.info("WebSocket client disconnected from positions stream.")
 
-    def get_latest_deals(self):
-        """Return and clear the latest deals collected by the DealSink."""
-        deals = self.latest_deals.copy()
+    async def stream_position_deltas(self, websocket: WebSocket):
+        """
+        WebSocket handler for the delta-encoded positions stream.
+
+        The client first receives {"type": "snapshot", "seq", "positions"} and
+        then {"type": "delta", "prev_seq", "seq", "added", "changed", "removed"}
+        messages, where "removed" holds tickets. A client whose seq does not
+        match the next delta's prev_seq sends {"action": "resync"} to get a new
+        snapshot. The server also falls back to a snapshot on its own gaps.
+        """
+        queue = self.positions_hub.subscribe()
+        self.positions_subscribers.append(websocket)
+        reader = asyncio.create_task(self._read_position_commands(websocket, queue))
+        logger.info(f"✅ WebSocket client connected for position deltas on {self.identifier}.")
+
+        try:
+            seq = await self._send_position_snapshot(websocket)
+            while True:
+                first = await self._next_or_closed(queue, reader)
+                if first is None:
+                    break
+
+                resync = False
+                changes = []
+                last = seq
+                for change_seq, op, record in drain(queue, first):
+                    if op in ("resync", "reset"):
+                        resync = True
+                    elif change_seq > last:
+                        resync = resync or change_seq != last + 1
+                        changes.append((op, record))
+                        last = change_seq
+
+                if resync:
+                    seq = await self._send_position_snapshot(websocket)
+                elif changes:
+                    await websocket.send_json({"type": "delta", "prev_seq": seq, "seq": last, **coalesce_changes(changes)})
+                    seq = last
+                await asyncio.sleep(self.POSITIONS_DELTA_INTERVAL)
+        except Exception as e:
+            logger.error(f"WebSocket error: {str(e)}")
+        finally:
+            reader.cancel()
+            self.touch()
+            self.positions_hub.unsubscribe(queue)
+            if websocket in self.positions_subscribers:
+                self.positions_subscribers.remove(websocket)
+            logger.info("WebSocket client disconnected from position deltas stream.")
+
+    async def _send_position_snapshot(self, websocket: WebSocket) -> int:
+        seq, positions = self.position_book.versioned_snapshot()
+        await websocket.send_json({"type": "snapshot", "seq": seq, "positions": positions})
+        return seq
+
+    @staticmethod
+    async def _wait_for_close(websocket: WebSocket):
+        """Read and ignore client messages until the client disconnects."""
+        while (await websocket.receive())["type"] != "websocket.disconnect":
+            pass
+
+    @staticmethod
+    async def _next_or_closed(queue: asyncio.Queue, reader: asyncio.Task):
+        """queue.get() raced against the client `reader`; None once the reader has ended."""
+        getter = asyncio.create_task(queue.get())
+        done, _ = await asyncio.wait({getter, reader}, return_when=asyncio.FIRST_COMPLETED)
+        if getter not in done:
+            getter.cancel()
+            return None
+        return getter.result()
+
+    @staticmethod
+    async def _read_position_commands(websocket: WebSocket, queue: asyncio.Queue):
+        """Turn client {"action": "resync"} messages into resync markers on `queue`."""
+        while True:
+            message = await websocket.receive_json()
+            if isinstance(message, dict) and message.get("action") == "resync":
+                try:
+                    queue.put_nowait((None, "resync", None))
+                except asyncio.QueueFull:
+                    pass  # overflowing queue already forces a snapshot
+
+    def publish_deals(self, deals: List[Dict]):
+        """Record parsed deals in the deal buffer and push them to websocket subscribers as one batch."""
+        published = []
+        for deal_info in deals:
+            seq = self.deal_log.append(deal_info)
+            deal_info["seq"] = seq
+            published.append((seq, deal_info))
+        if published:
+            self.deals_hub.publish(published)
+            logger.debug(f"Stored {len(published)} deals up to seq {published[-1][0]}")
+
+    def amend_deals(self, op: str, deals: List[Dict]):
+        """Apply dealer edits ("update") and removals ("delete") to the local deal store."""
+        if self.deal_store is not None:
+            self.deal_store.apply(op, deals)
+
+    def get_latest_deals(self, since: int = 0):
+        """Return the buffered deals newer than `since` (all buffered deals by default)."""
+        deals = [deal for _, deal in self.deal_log.since(since)[0]]
         if deals:
-            logger.debug(f"Retrieved latest deals: {deals}")
-        self.latest_deals.clear()
+            logger.debug(f"Retrieved {len(deals)} latest deals")
         return deals
 
-    def get_latest_positions(self):
-        """Fetch latest open positions."""
-        if not self.connected:
-            return {"error": "Not connected to MT5 Manager."}
-
-        logger.debug("Fetching latest positions.")
+    def start_feeds(self):
+        """Blocking: subscribe the sinks (once) and seed the caches after a (re)connect."""
+        self._feeds_stale = False
+        self.start_position_book()
+        self.start_group_cache()
+        self.start_symbol_cache()
+        self.start_user_directory()
+        self.start_deal_sink()
+        if self.deal_store is not None:
+            self.deal_store.request_resync()  # edits made while we were away
+
+    def start_deal_sink(self):
+        """With a deal store, subscribe the DealSink (once) so deal edits and deletes reach it."""
+        if self.deal_store is None or self.deals_subscribed:
+            return
+        self.deal_ingest.start()
+        if not self.manager.DealSubscribe(self.deals_sink):
+            logger.error(f"Failed to subscribe to deals: {MT5Manager.LastError()}")
+        else:
+            self.deals_subscribed = True
+
+    def start_position_book(self):
+        """Subscribe the PositionSink to the positions pump (once) and seed the book."""
+        if not self._positions_subscribed:
+            if not self.manager.PositionSubscribe(self.positions_sink):
+                logger.error(f"Failed to subscribe to positions: {MT5Manager.LastError()}")
+                return
+            self._positions_subscribed = True
+        self.load_position_book()
+
+    def start_group_cache(self):
+        """Subscribe the GroupSink (once); configurations may have changed while we were away."""
+        if not self._groups_subscribed:
+            if not self.manager.GroupSubscribe(self.groups_sink):
+                logger.error(f"Failed to subscribe to groups: {MT5Manager.LastError()}")
+            else:
+                self._groups_subscribed = True
+        self.group_configs.invalidate()
+
+    def start_symbol_cache(self):
+        """Subscribe the SymbolSink (once) and have the symbol cache reloaded on next use."""
+        if not self._symbols_subscribed:
+            if not self.manager.SymbolSubscribe(self.symbols_sink):
+                logger.error(f"Failed to subscribe to symbols: {MT5Manager.LastError()}")
+            else:
+                self._symbols_subscribed = True
+        self.symbol_cache.invalidate()
+
+    def load_symbol_cache(self):
+        """Blocking: load every symbol configuration into the symbol cache unless it is current."""
+        if self.symbol_cache.refresh(self._fetch_symbols):
+            logger.info(f"✅ Symbol cache loaded for {self.identifier}: {len(self.symbol_cache)} symbols")
+
+    def _fetch_symbols(self) -> List[Dict]:
+        total = self.manager.SymbolTotal()
+        symbols = []
+        for idx in range(total if total else 0):
+            sym = self.manager.SymbolNext(idx)
+            if not sym:
+                logger.warning(f"SymbolNext returned None at index {idx}")
+                continue
+            symbols.append(to_dict(sym))
+        return symbols
+
+    def start_user_directory(self):
+        """Subscribe the UserSink (once) and have the user directory reloaded on next use."""
+        if not self._users_subscribed:
+            if not self.manager.UserSubscribe(self.users_sink):
+                logger.error(f"Failed to subscribe to users: {MT5Manager.LastError()}")
+            else:
+                self._users_subscribed = True
+        self.user_directory.invalidate()
+
+    def load_user_directory(self):
+        """Blocking: load every user into the user directory with one UserGetByGroup, unless it is current."""
+        if self.user_directory.refresh(self._fetch_users):
+            logger.info(f"✅ User directory loaded for {self.identifier}: {len(self.user_directory)} users")
+
+    def _fetch_users(self) -> List[Dict]:
+        users = self.manager.UserGetByGroup("*")
+        if users is False:
+            raise RuntimeError(f"Failed to fetch users: {MT5Manager.LastError()}")
+        return to_dicts(users)
+
+    def load_position_book(self):
+        """Blocking: reload the whole position book with a single PositionRequest."""
+        self._positions_stale = False  # a sync arriving during the request marks it stale again
         positions = self.manager.PositionRequest()
+        if not isinstance(positions, list):
+            positions = []
+        self.position_book.load([parse_position(p) for p in positions])
+        logger.info(f"✅ Position book loaded for {self.identifier}: {len(self.position_book)} positions")
 
-        if not positions or not isinstance(positions, list):
-            return []
-
-        results = [
-            {
-                "ticket": getattr(position, "Ticket", "Unknown"),
-                "symbol": getattr(position, "Symbol", "Unknown"),
-                "type": getattr(position, "Type", "Unknown"),
-                "volume": getattr(position, "Volume", 0),
-                "price_open": getattr(position, "PriceOpen", 0),
-                "profit": getattr(position, "Profit", 0),
-                "time_open": getattr(position, "TimeString", "Unknown"),
-            }
-            for position in positions
-        ]
-        logger.debug(f"Latest positions: {results}")
-        return results
+    def get_latest_positions(self, login=None, symbol=None):
+        """Return open positions from the in-memory position book."""
+        if not self.connected:
+            return {"error": "Not connected to MT5 Manager."}
+        return self.position_book.snapshot(login=login, symbol=symbol)
 
 # ✅ Manage multiple MT5Manager instances
 def get_or_create_mt5_manager(identifier: str, server: str, login: int, password: str):
@@ -260,4 +876,22 @@ def get_or_create_mt5_manager(identifier: str, server: str, login: int, password
 
     manager = MT5ManagerService(identifier, server, login, password)
     mt5_managers[identifier] = manager
+    evicted_sessions.pop(identifier, None)  # a live session supersedes retained credentials
+    return manager
+
+
+def restore_mt5_manager(identifier: str) -> Optional[MT5ManagerService]:
+    """
+    Return the live MT5ManagerService for this identifier, re-creating it from
+    its retained credentials if it was evicted. None if it was never created.
+    """
+    if identifier in mt5_managers:
+        manager = mt5_managers[identifier]
+    elif identifier in evicted_sessions:
+        server, login, password = evicted_sessions.pop(identifier)
+        logger.info(f"♻️ Restoring evicted manager session {identifier}")
+        manager = get_or_create_mt5_manager(identifier, server, login, password)
+    else:
+        return None
+    manager.touch()
     return manager
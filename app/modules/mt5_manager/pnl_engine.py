@@ -0,0 +1,372 @@
+# app/modules/mt5_manager/pnl_engine.py
+
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import Date, Float, case, cast, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import CommissionTier, GroupConfig, ManagerDeal, TerminalFill
+from app.modules.mt5_manager.commission_index import CommissionIndex
+
+try:
+    import numpy as np
+except ImportError:  # the vectorized mode is optional
+    np = None
+
+# Rows per partition when streaming deal columns into arrays
+VECTOR_CHUNK_ROWS = 200_000
+
+
+def deal_filters(date_from: datetime, date_to: datetime, symbol: Optional[str] = None) -> list:
+    """Deals opened and closed inside [date_from, date_to], optionally for one symbol."""
+    filters = [ManagerDeal.open_time >= date_from, ManagerDeal.close_time <= date_to]
+    if symbol:
+        filters.append(ManagerDeal.symbol == symbol)
+    return filters
+
+
+def fill_filters(date_from: datetime, date_to: datetime, symbol: Optional[str] = None) -> list:
+    filters = [TerminalFill.time >= date_from, TerminalFill.time <= date_to]
+    if symbol:
+        filters.append(TerminalFill.symbol == symbol)
+    return filters
+
+
+def day_of(column):
+    """Calendar day of a DateTime column, as a Date."""
+    return func.date(column, type_=Date)
+
+
+def markup_expr():
+    """Spread markup revenue of one deal."""
+    return (ManagerDeal.open_price - ManagerDeal.gateway_price) * ManagerDeal.volume * ManagerDeal.contract_size
+
+
+def swap_expr():
+    """Client swap of one deal, from its group's long/short rate."""
+    rate = case((ManagerDeal.action == "Buy", GroupConfig.swap_long), else_=GroupConfig.swap_short)
+    return func.coalesce(rate, 0.0) * ManagerDeal.volume
+
+
+def lp_cost_expr():
+    return TerminalFill.profit + TerminalFill.swap + TerminalFill.commission
+
+
+def deal_totals_query(filters: list):
+    return (
+        select(
+            func.coalesce(func.sum(markup_expr()), 0.0),
+            func.coalesce(func.sum(swap_expr()), 0.0),
+        )
+        .select_from(ManagerDeal)
+        .outerjoin(GroupConfig, GroupConfig.group_id == ManagerDeal.group_id)
+        .where(*filters)
+    )
+
+
+def volume_buckets_query(filters: list):
+    """(group_id, volume, deal count): commission only depends on these two columns."""
+    return (
+        select(ManagerDeal.group_id, ManagerDeal.volume, func.count())
+        .where(*filters)
+        .group_by(ManagerDeal.group_id, ManagerDeal.volume)
+    )
+
+
+def lp_cost_query(filters: list):
+    return select(func.coalesce(func.sum(lp_cost_expr()), 0.0)).where(*filters)
+
+
+def tiers_query(group_ids: Iterable[int]):
+    return (
+        select(
+            CommissionTier.group_id,
+            CommissionTier.category,
+            CommissionTier.range_from,
+            CommissionTier.range_to,
+            CommissionTier.value,
+        )
+        .where(CommissionTier.group_id.in_(list(group_ids)))
+        .order_by(CommissionTier.group_id, CommissionTier.id)
+    )
+
+
+def commission_total(buckets, tiers: CommissionIndex) -> float:
+    """Σ rate × volume over (group_id, volume, count) buckets."""
+    return sum(
+        tiers.rate(group_id, volume) * volume * count
+        for group_id, volume, count in buckets
+        if volume is not None
+    )
+
+
+async def load_commission_index(db: AsyncSession, group_ids: Iterable[int]) -> CommissionIndex:
+    group_ids = [g for g in set(group_ids) if g is not None]
+    if not group_ids:
+        return CommissionIndex({})
+    return CommissionIndex.from_rows((await db.execute(tiers_query(group_ids))).all())
+
+
+async def deal_totals(db: AsyncSession, filters: list) -> Tuple[float, float, float]:
+    """(markup, commission, swap) of the deals matching `filters`."""
+    markup, swap = (await db.execute(deal_totals_query(filters))).one()
+    buckets = (await db.execute(volume_buckets_query(filters))).all()
+    tiers = await load_commission_index(db, (group_id for group_id, _, _ in buckets))
+    return float(markup), float(commission_total(buckets, tiers)), float(swap)
+
+
+async def lp_cost_total(db: AsyncSession, filters: list) -> float:
+    return float((await db.execute(lp_cost_query(filters))).scalar_one())
+
+
+def summarize(markup: float, commission: float, swap: float, lp_cost: float) -> Dict[str, float]:
+    return {
+        "total_markup": markup,
+        "total_commission": commission,
+        "total_swap_client": swap,
+        "total_lp_cost": lp_cost,
+        "broker_pnl": markup + commission - lp_cost,
+    }
+
+
+async def compute_pnl(
+    db: AsyncSession,
+    date_from: datetime,
+    date_to: datetime,
+    symbol: Optional[str] = None,
+) -> Dict[str, float]:
+    """
+    P&L summary with a fixed number of queries, independent of the deal count:
+    markup and swap aggregated in SQL, commission from (group, volume) buckets
+    priced with one bulk tier load, and LP cost aggregated in SQL.
+    """
+    markup, commission, swap = await deal_totals(db, deal_filters(date_from, date_to, symbol))
+    lp_cost = await lp_cost_total(db, fill_filters(date_from, date_to, symbol))
+    return summarize(markup, commission, swap, lp_cost)
+
+
+# ——— breakdown ———
+
+# Breakdown dimensions: deal column, and fill column where LP cost can be attributed
+BREAKDOWN_DIMENSIONS = {
+    "symbol": (ManagerDeal.symbol, TerminalFill.symbol),
+    "group": (ManagerDeal.group_id, None),
+    "login": (ManagerDeal.login, None),
+    "day": (day_of(ManagerDeal.close_time), day_of(TerminalFill.time)),
+}
+BREAKDOWN_SORT_KEYS = ("total_markup", "total_commission", "total_swap_client", "total_lp_cost", "broker_pnl", "deals")
+
+
+async def compute_breakdown(
+    db: AsyncSession,
+    date_from: datetime,
+    date_to: datetime,
+    by: Sequence[str],
+    symbol: Optional[str] = None,
+    sort: str = "broker_pnl",
+    descending: bool = True,
+    top: Optional[int] = 100,
+) -> Dict[str, Any]:
+    """
+    P&L per combination of `by` dimensions (symbol, group, login, day) in one
+    aggregation over the deals, plus one over the fills. Deals land on the
+    day they closed.
+
+    Fills carry only symbol and time, so LP cost is attributed to rows only
+    when `by` is limited to symbol and day; otherwise row LP cost is 0 and
+    it only shows up in the totals.
+    """
+    by = list(dict.fromkeys(by))
+    deal_dims = [BREAKDOWN_DIMENSIONS[d][0] for d in by]
+
+    # one pass over the deals: the dimensions plus (group, volume) so commission can be priced per bucket
+    rows = (await db.execute(
+        select(
+            *deal_dims, ManagerDeal.group_id, ManagerDeal.volume,
+            func.coalesce(func.sum(markup_expr()), 0.0),
+            func.coalesce(func.sum(swap_expr()), 0.0),
+            func.count(),
+        )
+        .select_from(ManagerDeal)
+        .outerjoin(GroupConfig, GroupConfig.group_id == ManagerDeal.group_id)
+        .where(*deal_filters(date_from, date_to, symbol))
+        .group_by(*deal_dims, ManagerDeal.group_id, ManagerDeal.volume)
+    )).all()
+    n = len(by)
+    tiers = await load_commission_index(db, (row[n] for row in rows))
+
+    cells: Dict[tuple, List[float]] = {}  # key -> [markup, commission, swap, lp_cost, deals]
+    for row in rows:
+        group_id, volume, markup, swap, count = row[n:]
+        cell = cells.setdefault(tuple(row[:n]), [0.0, 0.0, 0.0, 0.0, 0])
+        cell[0] += markup
+        if volume is not None:
+            cell[1] += tiers.rate(group_id, volume) * volume * count
+        cell[2] += swap
+        cell[4] += count
+
+    fills = fill_filters(date_from, date_to, symbol)
+    lp_cost = await lp_cost_total(db, fills)
+    if all(BREAKDOWN_DIMENSIONS[d][1] is not None for d in by):
+        fill_dims = [BREAKDOWN_DIMENSIONS[d][1] for d in by]
+        for row in (await db.execute(
+            select(*fill_dims, func.coalesce(func.sum(lp_cost_expr()), 0.0)).where(*fills).group_by(*fill_dims)
+        )).all():
+            cells.setdefault(tuple(row[:n]), [0.0, 0.0, 0.0, 0.0, 0])[3] += row[n]
+
+    result = []
+    for key, (markup, commission, swap, cost, count) in cells.items():
+        entry = dict(zip(by, key))
+        entry.update(summarize(markup, commission, swap, cost))
+        entry["deals"] = count
+        result.append(entry)
+    result.sort(key=lambda r: r[sort], reverse=descending)
+
+    totals = summarize(
+        sum(c[0] for c in cells.values()),
+        sum(c[1] for c in cells.values()),
+        sum(c[2] for c in cells.values()),
+        lp_cost,
+    )
+    return {
+        "row_count": len(result),
+        "rows": result[:top] if top is not None else result,
+        "totals": totals,
+    }
+
+
+# ——— vectorized mode ———
+
+def deal_columns_query(filters: list):
+    """The six per-deal P&L columns, all float8 with NULL as NaN (so COPY BINARY rows are fixed-size)."""
+    nan = float("nan")
+    return select(
+        func.coalesce(cast(ManagerDeal.open_price, Float), nan),
+        func.coalesce(cast(ManagerDeal.gateway_price, Float), nan),
+        func.coalesce(cast(ManagerDeal.volume, Float), nan),
+        func.coalesce(cast(ManagerDeal.contract_size, Float), nan),
+        case((ManagerDeal.action == "Buy", 1.0), else_=0.0),
+        cast(func.coalesce(ManagerDeal.group_id, -1), Float),
+    ).where(*filters)
+
+
+def swap_rates_query(group_ids: Iterable[int]):
+    return select(GroupConfig.group_id, GroupConfig.swap_long, GroupConfig.swap_short).where(
+        GroupConfig.group_id.in_(list(group_ids))
+    )
+
+
+def vector_commission_rates(volume, group_idx, group_ids, tiers: CommissionIndex):
+    """
+    Per-deal commission rate. Deals are sorted by group once, and each
+    group's contiguous slice gets one vector tier lookup.
+    """
+    order = np.argsort(group_idx, kind="stable")
+    bounds = np.searchsorted(group_idx[order], np.arange(len(group_ids) + 1))
+    sorted_volume = volume[order]
+    sorted_rates = np.zeros(len(volume))
+    for idx, group_id in enumerate(group_ids):
+        lo, hi = bounds[idx], bounds[idx + 1]
+        if lo < hi and int(group_id) in tiers:
+            sorted_rates[lo:hi] = tiers.rates(int(group_id), sorted_volume[lo:hi])
+    rates = np.empty_like(sorted_rates)
+    rates[order] = sorted_rates
+    return rates
+
+
+def vector_totals(columns, swap_rates: Dict[int, Tuple[float, float]], tiers: CommissionIndex) -> Tuple[float, float, float]:
+    """
+    (markup, commission, swap) over deal column arrays. Group parameters are
+    broadcast from per-group lookup tables indexed by np.unique's inverse.
+    NULL columns arrive as NaN and are skipped like SQL SUM skips NULLs.
+    """
+    open_price, gateway_price, volume, contract_size, is_buy, group_id = columns
+    markup = np.nansum((open_price - gateway_price) * volume * contract_size)
+
+    group_ids, group_idx = np.unique(group_id, return_inverse=True)
+    swap_long = np.array([swap_rates.get(int(g), (0.0, 0.0))[0] or 0.0 for g in group_ids])
+    swap_short = np.array([swap_rates.get(int(g), (0.0, 0.0))[1] or 0.0 for g in group_ids])
+    swap = np.nansum(np.where(is_buy == 1.0, swap_long[group_idx], swap_short[group_idx]) * volume)
+
+    commission = np.nansum(vector_commission_rates(volume, group_idx, group_ids, tiers) * volume)
+    return float(markup), float(commission), float(swap)
+
+
+# PostgreSQL COPY BINARY: 11-byte signature, int32 flags, int32 header-extension length;
+# then per row an int16 field count and (int32 length, value) per field; int16 -1 trailer.
+_COPY_HEADER = 19
+_COPY_ROW = None if np is None else np.dtype(
+    [("fields", ">i2")] + [item for i in range(6) for item in ((f"len{i}", ">i4"), (f"col{i}", ">f8"))]
+)
+
+
+class _CopyColumns:
+    """Decodes a COPY BINARY stream of six float8 columns into arrays, chunk by chunk."""
+
+    def __init__(self):
+        self._pending = b""
+        self._header_done = False
+        self._chunks: List = []
+
+    async def __call__(self, data: bytes):
+        buf = self._pending + bytes(data)
+        if not self._header_done:
+            if len(buf) < _COPY_HEADER:
+                self._pending = buf
+                return
+            buf = buf[_COPY_HEADER + int.from_bytes(buf[15:19], "big"):]
+            self._header_done = True
+        whole = len(buf) // _COPY_ROW.itemsize * _COPY_ROW.itemsize  # the 2-byte trailer never fills a row
+        if whole:
+            self._chunks.append(np.frombuffer(buf[:whole], dtype=_COPY_ROW))
+        self._pending = buf[whole:]
+
+    def columns(self):
+        rows = np.concatenate(self._chunks) if self._chunks else np.empty(0, dtype=_COPY_ROW)
+        return tuple(rows[f"col{i}"].astype(float) for i in range(6))
+
+
+async def load_deal_columns(db: AsyncSession, filters: list):
+    """
+    The deal columns needed for P&L as six float arrays. On asyncpg they
+    are pulled with COPY BINARY and decoded straight into arrays, with no
+    Python object per deal; other drivers stream row partitions.
+    """
+    query = deal_columns_query(filters)
+    conn = await db.connection()
+    if conn.dialect.driver == "asyncpg":
+        compiled = query.compile(dialect=conn.dialect)
+        args = [compiled.params[name] for name in compiled.positiontup]
+        raw = await conn.get_raw_connection()
+        sink = _CopyColumns()
+        await raw.driver_connection.copy_from_query(str(compiled), *args, output=sink, format="binary")
+        return sink.columns()
+
+    result = await db.stream(query.execution_options(yield_per=VECTOR_CHUNK_ROWS))
+    chunks = [np.array(part, dtype=float) async for part in result.partitions()]
+    rows = np.concatenate(chunks) if chunks else np.empty((0, 6))
+    return tuple(rows[:, i] for i in range(6))
+
+
+async def compute_pnl_vectorized(
+    db: AsyncSession,
+    date_from: datetime,
+    date_to: datetime,
+    symbol: Optional[str] = None,
+) -> Dict[str, float]:
+    """compute_pnl with the per-deal arithmetic done on NumPy arrays."""
+    if np is None:
+        raise RuntimeError("NumPy is not installed; the vectorized P&L mode is unavailable")
+    columns = await load_deal_columns(db, deal_filters(date_from, date_to, symbol))
+
+    group_ids = [int(g) for g in np.unique(columns[5]) if g >= 0]
+    swap_rates: Dict[int, Tuple[float, float]] = {}
+    if group_ids:
+        rows = (await db.execute(swap_rates_query(group_ids))).all()
+        swap_rates = {group_id: (swap_long, swap_short) for group_id, swap_long, swap_short in rows}
+    tiers = await load_commission_index(db, group_ids)
+
+    markup, commission, swap = vector_totals(columns, swap_rates, tiers)
+    lp_cost = await lp_cost_total(db, fill_filters(date_from, date_to, symbol))
+    return summarize(markup, commission, swap, lp_cost)
@@ -0,0 +1,288 @@
+# app/modules/mt5_manager/pnl_rollup.py
+
+import asyncio
+import logging
+import os
+from datetime import date, datetime, time, timedelta
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import func, or_, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.db import AsyncSessionLocal, engine
+from app.models import GroupConfig, ManagerDeal, PnLDailyDeals, PnLDailyFills, PnLRollupState, TerminalFill
+from app.modules.mt5_manager.pnl_engine import (
+    compute_pnl,
+    day_of,
+    deal_filters,
+    deal_totals,
+    fill_filters,
+    load_commission_index,
+    lp_cost_expr,
+    lp_cost_total,
+    markup_expr,
+    summarize,
+    swap_expr,
+)
+
+logger = logging.getLogger(__name__)
+
+# Seconds between background refreshes, and how many of the newest source ids
+# each refresh leaves unfolded (see refresh_rollups)
+ROLLUP_REFRESH_INTERVAL = float(os.getenv("MT5_PNL_ROLLUP_INTERVAL", "300"))
+ROLLUP_ID_LAG = int(os.getenv("MT5_PNL_ROLLUP_ID_LAG", "1000"))
+
+ROLLUP_TABLES = (PnLDailyDeals, PnLDailyFills, PnLRollupState)
+
+# Serializes refreshes within this process; the state row lock covers other processes
+_refresh_lock = asyncio.Lock()
+_refresher: Optional[asyncio.Task] = None
+
+DealKey = Tuple[date, date, str, Optional[int]]
+
+
+async def init_rollup_tables():
+    """Create the rollup tables (application startup); app.db's init_db does not know app.models."""
+    async with engine.begin() as conn:
+        await conn.run_sync(lambda sync: [t.__table__.create(sync, checkfirst=True) for t in ROLLUP_TABLES])
+
+
+async def _state(db: AsyncSession, name: str) -> PnLRollupState:
+    """The state row of one rollup, locked for this transaction."""
+    # the row must exist before it can be locked: create it idempotently first
+    dialect = (await db.connection()).dialect.name
+    insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+    await db.execute(
+        insert(PnLRollupState).values(name=name, last_id=0).on_conflict_do_nothing(index_elements=["name"])
+    )
+    return (
+        await db.execute(select(PnLRollupState).where(PnLRollupState.name == name).with_for_update())
+    ).scalar_one()
+
+
+async def _fold_deals(db: AsyncSession, last_id: int, high_id: int) -> int:
+    """Add deals with last_id < id <= high_id to pnl_daily_deals; returns the deal count."""
+    open_day, close_day = day_of(ManagerDeal.open_time), day_of(ManagerDeal.close_time)
+    rows = (await db.execute(
+        select(
+            open_day, close_day, ManagerDeal.symbol, ManagerDeal.group_id, ManagerDeal.volume,
+            func.coalesce(func.sum(markup_expr()), 0.0),
+            func.coalesce(func.sum(swap_expr()), 0.0),
+            func.count(),
+        )
+        .select_from(ManagerDeal)
+        .outerjoin(GroupConfig, GroupConfig.group_id == ManagerDeal.group_id)
+        .where(
+            ManagerDeal.id > last_id,
+            ManagerDeal.id <= high_id,
+            # a deal without both times matches no P&L range (and NULL keys would never merge)
+            ManagerDeal.open_time.isnot(None),
+            ManagerDeal.close_time.isnot(None),
+        )
+        .group_by(open_day, close_day, ManagerDeal.symbol, ManagerDeal.group_id, ManagerDeal.volume)
+    )).all()
+    if not rows:
+        return 0
+
+    # fold the volume buckets into one delta per rollup key, pricing commission per bucket
+    tiers = await load_commission_index(db, (row[3] for row in rows))
+    deltas: Dict[DealKey, list] = {}
+    for o_day, c_day, symbol, group_id, volume, markup, swap, count in rows:
+        delta = deltas.setdefault((o_day, c_day, symbol, group_id), [0.0, 0.0, 0.0, 0])
+        delta[0] += markup
+        if volume is not None:
+            delta[1] += tiers.rate(group_id, volume) * volume * count
+        delta[2] += swap
+        delta[3] += count
+
+    open_days = {key[0] for key in deltas}
+    existing = {
+        (r.open_day, r.close_day, r.symbol, r.group_id): r
+        for r in (await db.execute(
+            select(PnLDailyDeals).where(PnLDailyDeals.open_day.in_(open_days))
+        )).scalars()
+    }
+    for key, (markup, commission, swap, count) in deltas.items():
+        row = existing.get(key)
+        if row is None:
+            db.add(PnLDailyDeals(
+                open_day=key[0], close_day=key[1], symbol=key[2], group_id=key[3],
+                markup=markup, commission=commission, swap=swap, deals=count,
+            ))
+        else:
+            row.markup += markup
+            row.commission += commission
+            row.swap += swap
+            row.deals += count
+    return sum(delta[3] for delta in deltas.values())
+
+
+async def _fold_fills(db: AsyncSession, last_id: int, high_id: int) -> int:
+    """Add fills with last_id < id <= high_id to pnl_daily_fills; returns the fill count."""
+    day = day_of(TerminalFill.time)
+    rows = (await db.execute(
+        select(day, TerminalFill.symbol, func.coalesce(func.sum(lp_cost_expr()), 0.0), func.count())
+        .where(TerminalFill.id > last_id, TerminalFill.id <= high_id, TerminalFill.time.isnot(None))
+        .group_by(day, TerminalFill.symbol)
+    )).all()
+    if not rows:
+        return 0
+
+    existing = {
+        (r.day, r.symbol): r
+        for r in (await db.execute(
+            select(PnLDailyFills).where(PnLDailyFills.day.in_({row[0] for row in rows}))
+        )).scalars()
+    }
+    for f_day, symbol, lp_cost, count in rows:
+        row = existing.get((f_day, symbol))
+        if row is None:
+            db.add(PnLDailyFills(day=f_day, symbol=symbol, lp_cost=lp_cost, fills=count))
+        else:
+            row.lp_cost += lp_cost
+            row.fills += count
+    return sum(row[3] for row in rows)
+
+
+async def refresh_rollups(db: AsyncSession) -> Tuple[int, int]:
+    """
+    Fold deals and fills inserted since the last refresh into the daily
+    rollups and commit; returns (deals, fills) folded.
+
+    Source rows are tracked by id watermark, so they are assumed to be
+    append-only. Call `rebuild_rollups` after editing source rows or
+    commission tiers / group swaps.
+
+    Limit: ids are handed out at insert time but rows become visible at
+    commit, so a row from a transaction still open when a higher id was
+    read would fall below the watermark and never be folded. Each refresh
+    therefore stops ROLLUP_ID_LAG ids short of max(id); a writer lagging
+    by more than that still needs a rebuild. Reads are unaffected by the
+    lag: rows above the watermark are aggregated raw.
+    """
+    async with _refresh_lock:
+        folded = []
+        for name, model, fold in (("deals", ManagerDeal, _fold_deals), ("fills", TerminalFill, _fold_fills)):
+            state = await _state(db, name)
+            high_id = max(((await db.execute(select(func.max(model.id)))).scalar_one() or 0) - ROLLUP_ID_LAG, 0)
+            count = 0
+            if high_id > (state.last_id or 0):
+                count = await fold(db, state.last_id or 0, high_id)
+                state.last_id = high_id
+            folded.append(count)
+        await db.commit()
+
+    if any(folded):
+        logger.info(f"🔵 P&L rollups refreshed: {folded[0]} deals, {folded[1]} fills")
+    return folded[0], folded[1]
+
+
+async def rebuild_rollups(db: AsyncSession) -> Tuple[int, int]:
+    """Drop both rollups and fold every source row again."""
+    async with _refresh_lock:
+        await db.execute(PnLDailyDeals.__table__.delete())
+        await db.execute(PnLDailyFills.__table__.delete())
+        await db.execute(PnLRollupState.__table__.delete())
+        await db.commit()
+    logger.info("♻️ P&L rollups cleared, rebuilding")
+    return await refresh_rollups(db)
+
+
+def _full_days(date_from: datetime, date_to: datetime) -> Tuple[datetime, datetime]:
+    """[first, last) midnights of the whole days inside [date_from, date_to]."""
+    first = datetime.combine(date_from.date(), time.min, tzinfo=date_from.tzinfo)
+    if first < date_from:
+        first += timedelta(days=1)
+    last = datetime.combine(date_to.date(), time.min, tzinfo=date_to.tzinfo)
+    return first, last
+
+
+def _watermark(name: str):
+    return (
+        select(func.coalesce(func.max(PnLRollupState.last_id), 0))
+        .where(PnLRollupState.name == name)
+        .scalar_subquery()
+    )
+
+
+async def compute_pnl_rolled(
+    db: AsyncSession,
+    date_from: datetime,
+    date_to: datetime,
+    symbol: Optional[str] = None,
+) -> Dict[str, float]:
+    """
+    compute_pnl answered from the daily rollups, read-only. Deals opened and
+    closed on whole days inside the range come from the rollup; deals
+    touching the partial edge days, and rows not folded yet (id above the
+    watermark), are aggregated from raw rows. Results are exact however
+    stale the rollups are; refreshing is left to the background job.
+    """
+    first, last = _full_days(date_from, date_to)
+    if first >= last:
+        return await compute_pnl(db, date_from, date_to, symbol)
+
+    rolled_deals = [PnLDailyDeals.open_day >= first.date(), PnLDailyDeals.close_day < last.date()]
+    rolled_fills = [PnLDailyFills.day >= first.date(), PnLDailyFills.day < last.date()]
+    if symbol:
+        rolled_deals.append(PnLDailyDeals.symbol == symbol)
+        rolled_fills.append(PnLDailyFills.symbol == symbol)
+    # rollup sums and their watermark in one statement, so both come from the same snapshot
+    deals_id, markup, commission, swap = (await db.execute(
+        select(
+            _watermark("deals"),
+            select(func.coalesce(func.sum(PnLDailyDeals.markup), 0.0)).where(*rolled_deals).scalar_subquery(),
+            select(func.coalesce(func.sum(PnLDailyDeals.commission), 0.0)).where(*rolled_deals).scalar_subquery(),
+            select(func.coalesce(func.sum(PnLDailyDeals.swap), 0.0)).where(*rolled_deals).scalar_subquery(),
+        )
+    )).one()
+    fills_id, lp_cost = (await db.execute(
+        select(
+            _watermark("fills"),
+            select(func.coalesce(func.sum(PnLDailyFills.lp_cost), 0.0)).where(*rolled_fills).scalar_subquery(),
+        )
+    )).one()
+
+    # raw: everything in range that the rollup part above did not cover
+    edge_markup, edge_commission, edge_swap = await deal_totals(db, deal_filters(date_from, date_to, symbol) + [
+        or_(ManagerDeal.open_time < first, ManagerDeal.close_time >= last, ManagerDeal.id > deals_id)
+    ])
+    edge_lp_cost = await lp_cost_total(db, fill_filters(date_from, date_to, symbol) + [
+        or_(TerminalFill.time < first, TerminalFill.time >= last, TerminalFill.id > fills_id)
+    ])
+    return summarize(
+        float(markup) + edge_markup,
+        float(commission) + edge_commission,
+        float(swap) + edge_swap,
+        float(lp_cost) + edge_lp_cost,
+    )
+
+
+# ——— background refresh ———
+
+async def _refresh_forever():
+    while True:
+        try:
+            async with AsyncSessionLocal() as db:
+                await refresh_rollups(db)
+        except Exception as e:
+            logger.error(f"P&L rollup refresh failed: {repr(e)}")
+        await asyncio.sleep(ROLLUP_REFRESH_INTERVAL)
+
+
+def start_rollup_refresher():
+    global _refresher
+    if _refresher is None or _refresher.done():
+        _refresher = asyncio.get_running_loop().create_task(_refresh_forever())
+
+
+async def stop_rollup_refresher():
+    global _refresher
+    if _refresher is not None:
+        _refresher.cancel()
+        try:
+            await _refresher
+        except asyncio.CancelledError:
+            pass
+        _refresher = None
@@ -0,0 +1,151 @@
+# app/modules/mt5_manager/positions.py
+
+import threading
+from collections import defaultdict
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+
+def parse_position(position) -> Dict:
+    """Convert an IMTPosition into the dict shape served by the positions endpoints."""
+    ticket = getattr(position, "Position", None)
+    if ticket is None:
+        ticket = getattr(position, "Ticket", "Unknown")
+    return {
+        "ticket": ticket,
+        "login": getattr(position, "Login", None),
+        "symbol": getattr(position, "Symbol", "Unknown"),
+        "type": getattr(position, "Type", "Unknown"),
+        "volume": getattr(position, "Volume", 0),
+        "price_open": getattr(position, "PriceOpen", 0),
+        "profit": getattr(position, "Profit", 0),
+        "time_open": getattr(position, "TimeString", "Unknown"),
+    }
+
+
+class PositionBook:
+    """
+    In-memory book of open positions, indexed by ticket, login and symbol.
+
+    Written from the MT5 pump thread by the PositionSink callbacks and read
+    by the REST/websocket handlers, so every access goes through a lock.
+    Every mutation bumps `seq` and calls `on_change(seq, op, record)` with
+    op being "add", "update", "remove" or "reset".
+    """
+
+    def __init__(self, on_change: Optional[Callable[[int, str, Optional[Dict]], None]] = None):
+        self._lock = threading.Lock()
+        self._by_ticket: Dict[object, Dict] = {}
+        self._by_login: Dict[object, Set] = defaultdict(set)
+        self._by_symbol: Dict[object, Set] = defaultdict(set)
+        self.on_change = on_change
+        self.loaded = False
+        self.seq = 0
+
+    def __len__(self) -> int:
+        return len(self._by_ticket)
+
+    def _index(self, record: Dict):
+        ticket = record["ticket"]
+        self._by_ticket[ticket] = record
+        self._by_login[record["login"]].add(ticket)
+        self._by_symbol[record["symbol"]].add(ticket)
+
+    def _unindex(self, ticket) -> Optional[Dict]:
+        record = self._by_ticket.pop(ticket, None)
+        if record is None:
+            return None
+        for index, key in ((self._by_login, record["login"]), (self._by_symbol, record["symbol"])):
+            tickets = index.get(key)
+            if tickets is not None:
+                tickets.discard(ticket)
+                if not tickets:
+                    del index[key]
+        return record
+
+    def _notify(self, op: str, record: Optional[Dict]):
+        # called with the lock held so listeners see changes in seq order
+        self.seq += 1
+        if self.on_change is not None:
+            self.on_change(self.seq, op, record)
+
+    def load(self, records: List[Dict]):
+        """Replace the whole book with a fresh snapshot."""
+        with self._lock:
+            self._by_ticket.clear()
+            self._by_login.clear()
+            self._by_symbol.clear()
+            for record in records:
+                self._index(record)
+            self.loaded = True
+            self._notify("reset", None)
+
+    def upsert(self, record: Dict):
+        with self._lock:
+            existed = self._unindex(record["ticket"]) is not None
+            self._index(record)
+            self._notify("update" if existed else "add", record)
+
+    def remove(self, ticket):
+        with self._lock:
+            record = self._unindex(ticket)
+            if record is not None:
+                self._notify("remove", record)
+
+    def remove_login(self, login):
+        """Drop every position of `login` (OnPositionClean)."""
+        with self._lock:
+            for ticket in list(self._by_login.get(login, ())):
+                self._notify("remove", self._unindex(ticket))
+
+    def get(self, ticket) -> Optional[Dict]:
+        with self._lock:
+            return self._by_ticket.get(ticket)
+
+    def snapshot(self, login=None, symbol=None) -> List[Dict]:
+        """Return the open positions, optionally narrowed by login and/or symbol."""
+        return self.versioned_snapshot(login=login, symbol=symbol)[1]
+
+    def versioned_snapshot(self, login=None, symbol=None) -> Tuple[int, List[Dict]]:
+        """Like `snapshot()`, but also return the sequence number it reflects."""
+        with self._lock:
+            if login is None and symbol is None:
+                return self.seq, list(self._by_ticket.values())
+            tickets = None
+            if login is not None:
+                tickets = set(self._by_login.get(login, ()))
+            if symbol is not None:
+                by_symbol = self._by_symbol.get(symbol, set())
+                tickets = by_symbol.copy() if tickets is None else tickets & by_symbol
+            return self.seq, [self._by_ticket[t] for t in tickets]
+
+
+def coalesce_changes(changes: List[Tuple[str, Dict]]) -> Dict[str, list]:
+    """
+    Fold a run of (op, record) book changes into the net added / changed /
+    removed sets, so a position touched many times costs one record.
+    """
+    added: Dict[object, Dict] = {}
+    changed: Dict[object, Dict] = {}
+    removed: Dict[object, None] = {}
+    for op, record in changes:
+        ticket = record["ticket"]
+        if op == "add":
+            if ticket in removed:
+                del removed[ticket]
+                changed[ticket] = record
+            else:
+                added[ticket] = record
+        elif op == "update":
+            if ticket in added:
+                added[ticket] = record
+            else:
+                changed[ticket] = record
+        elif op == "remove":
+            if added.pop(ticket, None) is None:
+                changed.pop(ticket, None)
+                removed[ticket] = None
+    return {
+        "added": list(added.values()),
+        "changed": list(changed.values()),
+        "removed": list(removed),
+    }
@@ -1,12 +1,14 @@
 from fastapi import APIRouter
-from app.modules.mt5_manager.manager import get_or_create_mt5_manager, mt5_managers
+from app.modules.mt5_manager.manager import evicted_sessions, get_or_create_mt5_manager, mt5_managers
+from app.modules.mt5_manager.routes.deps import peek_manager, run_on_manager
+from app.modules.mt5_manager.sessions import session_readiness
 
 router = APIRouter(prefix="/accounts")
 
 
 # ✅ Connect to an MT5 Manager instance
 @router.post("/{identifier}/connect")
-def connect_mt5_manager(identifier: str, server: str, login: int, password: str):
+async def connect_mt5_manager(identifier: str, server: str, login: int, password: str):
     """Connect to an MT5 Manager instance.
        Returns 'already connected' if the connection is already established.
     """
@@ -14,8 +16,10 @@ def connect_mt5_manager(identifier: str, server: str, login: int, password: str)
     if manager.connected:
         return {"status": "already connected"}
 
-    success = manager.connect()
-    return {"status": "connected" if success else "failed"}
+    # the supervisor owns the connection from here on and keeps retrying on failure
+    manager.start_supervisor()
+    success = await manager.wait_first_attempt(timeout=manager.CONNECT_TIMEOUT)
+    return {"status": "connected" if success else "failed", "state": manager.state, "error": manager.last_error}
 
 
 # ✅ List active managers
@@ -29,17 +33,44 @@ def list_active_managers():
             "server": manager.server,
             "login": manager.login,
             "connected": manager.connected,
+            "state": manager.state,
+            "last_error": manager.last_error,
         }
         active.append(details)
-    return {"active_managers": active}
+    return {"active_managers": active, "evicted_managers": list(evicted_sessions)}
+
+
+# ✅ Readiness of all sessions (e.g. those started from the session config)
+@router.get("/ready")
+def sessions_ready():
+    """Report each manager session's state and whether all of them are connected."""
+    return session_readiness()
+
+
+@router.get("/{identifier}/status")
+def manager_status(identifier: str):
+    """Connection state of a single manager session ("evicted" ones are not restored)."""
+    manager = peek_manager(identifier)
+    if manager is None:
+        return {"identifier": identifier, "connected": False, "state": "evicted", "last_error": None}
+    return {
+        "identifier": identifier,
+        "connected": manager.connected,
+        "state": manager.state,
+        "last_error": manager.last_error,
+    }
 
 
 # ✅ Disconnect a manager
 @router.get("/{identifier}/disconnect")
-def disconnect_mt5_manager(identifier: str):
+async def disconnect_mt5_manager(identifier: str):
     """Disconnect a specific MT5 Manager instance."""
+    evicted = evicted_sessions.pop(identifier, None) is not None
     if identifier in mt5_managers:
-        success = mt5_managers[identifier].disconnect()
-        del mt5_managers[identifier]
+        manager = mt5_managers.pop(identifier)
+        await manager.stop_supervisor()
+        success = await run_on_manager(manager, manager.close, timeout=manager.CONNECT_TIMEOUT)
         return {"status": "disconnected" if success else "not connected"}
+    if evicted:
+        return {"status": "not connected"}
     return {"error": "Manager instance not found."}
\ No newline at end of file
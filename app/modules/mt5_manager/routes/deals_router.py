@@ -1,31 +1,44 @@
-from fastapi import APIRouter, WebSocket, WebSocketDisconnect, HTTPException, Query
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect, HTTPException, Query, Request
+from app.core.ndjson import ndjson_response_async, wants_ndjson
+from app.modules.mt5_manager.deal_store import fetch_history, iter_history
 from app.modules.mt5_manager.deals_mapping import parse_deal
-from app.modules.mt5_manager.manager import mt5_managers
+from app.modules.mt5_manager.history import fetch_sliced, iter_sliced, split_groups
+from app.modules.mt5_manager.manager import restore_mt5_manager
+from app.modules.mt5_manager.routes.deps import get_connected_manager, peek_manager, run_on_manager
+import asyncio
 import logging
 import datetime
+from typing import Optional
 import MT5Manager
 
 router = APIRouter(prefix="/deals")
 logger = logging.getLogger(__name__)
 
 @router.websocket("/ws/{identifier}")
-async def websocket_deals(websocket: WebSocket, identifier: str):
+async def websocket_deals(
+    websocket: WebSocket,
+    identifier: str,
+    since: Optional[int] = Query(None, description="Replay buffered deals after this sequence number"),
+):
     """
     WebSocket for streaming live deals for a specific MT5 Manager instance.
+    Reconnecting clients pass the last `seq` they received as `since`.
     """
     logger.info(f"🔵 WebSocket connection attempt: {identifier}")
 
-    if identifier not in mt5_managers:
+    manager_instance = restore_mt5_manager(identifier)
+    if manager_instance is None:
         logger.warning(f"❌ WebSocket rejected: Manager instance '{identifier}' not found.")
         await websocket.accept()
         await websocket.close(code=1008)
         return
 
     await websocket.accept()
+    manager_instance.start_supervisor()
     logger.info(f"✅ WebSocket connected: {identifier}")
 
     try:
-        await mt5_managers[identifier].subscribe_to_deals(websocket)
+        await manager_instance.subscribe_to_deals(websocket, since=since)
     except WebSocketDisconnect:
         logger.warning(f"🔴 WebSocket disconnected: {identifier}")
     except Exception as e:
@@ -35,17 +48,73 @@ async def websocket_deals(websocket: WebSocket, identifier: str):
 
 
 @router.get("/{identifier}/latest")
-def get_latest_deals(identifier: str):
+def get_latest_deals(
+    identifier: str,
+    since: int = Query(0, description="Only deals with a sequence number above this one"),
+):
     """
-    Retrieve the latest deals for a specific MT5 Manager instance.
+    Retrieve the latest deals for a specific MT5 Manager instance
+    from its bounded deal buffer. An evicted session has no buffered deals.
     """
-    if identifier not in mt5_managers:
+    try:
+        manager_instance = peek_manager(identifier)
+    except HTTPException:
         return {"error": "Manager instance not found."}
-    return mt5_managers[identifier].get_latest_deals()
+    if manager_instance is None:
+        return []
+    return manager_instance.get_latest_deals(since=since)
+
+
+@router.get("/{identifier}/ingest-stats")
+def get_deal_ingest_stats(identifier: str):
+    """
+    Queue depth and per-stage latency counters of the live deal ingest pipeline.
+    """
+    manager_instance = peek_manager(identifier)
+    if manager_instance is None:
+        return {"state": "evicted"}
+    return {
+        **manager_instance.deal_ingest.stats(),
+        "buffered_deals": len(manager_instance.deal_log),
+        "last_seq": manager_instance.deal_log.last_seq,
+        "subscribers": manager_instance.deals_hub.subscriber_count,
+    }
+
+
+def _request_deals(manager_instance, method: str, *args):
+    """Blocking: run a DealRequest* call and parse the result. Executed on the manager's executor."""
+    deals = getattr(manager_instance.manager, method)(*args)
+    if deals is False:
+        error = f"Failed to request deals: {MT5Manager.LastError()}"
+        raise HTTPException(status_code=500, detail=error)
+    return [parse_deal(deal) for deal in deals]
+
+
+async def _deal_history(request: Request, manager_instance, method: str, keys: list, args: tuple,
+                        date_from: datetime.datetime, date_to: datetime.datetime, **filters):
+    """
+    History for `method(key, *args, slice_from, slice_to)`: synced ranges come from
+    the local deal store, the unsynced tail goes upstream in concurrent time (and key)
+    slices. With `Accept: application/x-ndjson` the deals are streamed one per line.
+    """
+    def fetch(key, slice_from, slice_to):
+        return _request_deals(manager_instance, method, key, *args, slice_from, slice_to)
+
+    try:
+        if wants_ndjson(request):
+            upstream = lambda a, b: iter_sliced(manager_instance, fetch, a, b, keys=keys)
+            return await ndjson_response_async(
+                iter_history(manager_instance, upstream, date_from, date_to, **filters)
+            )
+        upstream = lambda a, b: fetch_sliced(manager_instance, fetch, a, b, keys=keys)
+        return {"deals": await fetch_history(manager_instance, upstream, date_from, date_to, **filters)}
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail=f"MT5 Manager call timed out for {manager_instance.identifier}")
 
 
 @router.get("/{identifier}/by-group")
-def get_deals_by_group(
+async def get_deals_by_group(
+    request: Request,
     identifier: str,
     groups: str,
     date_from: datetime.datetime = Query(..., description="Start date in ISO 8601 format (e.g., 2025-04-01T00:00:00)"),
@@ -53,28 +122,20 @@ def get_deals_by_group(
 ):
     """
     Get deals history for a group (or comma separated groups) within a specified date range.
+    Synced history is served from the local deal store; only the unsynced tail goes upstream,
+    split into time and group slices that are fetched concurrently.
+    Send `Accept: application/x-ndjson` to stream the deals as NDJSON.
     """
-    if identifier not in mt5_managers:
-        raise HTTPException(status_code=404, detail="Manager session not found for identifier.")
-
-    manager_instance = mt5_managers[identifier]
-    if not manager_instance.connected:
-        if not manager_instance.connect():
-            raise HTTPException(
-                status_code=500,
-                detail=f"Failed to connect using session for {identifier}: {MT5Manager.LastError()}"
-            )
-
-    deals = manager_instance.manager.DealRequestByGroup(groups, date_from, date_to)
-    if deals is False:
-        error = f"Failed to request deals: {MT5Manager.LastError()}"
-        raise HTTPException(status_code=500, detail=error)
-    parsed_deals = [parse_deal(deal) for deal in deals]
-    return {"deals": parsed_deals}
+    manager_instance = await get_connected_manager(identifier)
+    return await _deal_history(
+        request, manager_instance, "DealRequestByGroup", split_groups(groups), (),
+        date_from, date_to, groups=groups,
+    )
 
 
 @router.get("/{identifier}/by-group-symbol")
-def get_deals_by_group_symbol(
+async def get_deals_by_group_symbol(
+    request: Request,
     identifier: str,
     groups: str,
     symbol: str,
@@ -84,27 +145,16 @@ def get_deals_by_group_symbol(
     """
     Get deals history for the specified group(s) and symbol within a specified date range.
     """
-    if identifier not in mt5_managers:
-        raise HTTPException(status_code=404, detail="Manager session not found for identifier.")
-
-    manager_instance = mt5_managers[identifier]
-    if not manager_instance.connected:
-        if not manager_instance.connect():
-            raise HTTPException(
-                status_code=500,
-                detail=f"Failed to connect using session for {identifier}: {MT5Manager.LastError()}"
-            )
-
-    deals = manager_instance.manager.DealRequestByGroupSymbol(groups, symbol, date_from, date_to)
-    if deals is False:
-        error = f"Failed to request deals: {MT5Manager.LastError()}"
-        raise HTTPException(status_code=500, detail=error)
-    parsed_deals = [parse_deal(deal) for deal in deals]
-    return {"deals": parsed_deals}
+    manager_instance = await get_connected_manager(identifier)
+    return await _deal_history(
+        request, manager_instance, "DealRequestByGroupSymbol", split_groups(groups), (symbol,),
+        date_from, date_to, groups=groups, symbol=symbol,
+    )
 
 
 @router.get("/{identifier}/by-logins")
-def get_deals_by_logins(
+async def get_deals_by_logins(
+    request: Request,
     identifier: str,
     logins: str,
     date_from: datetime.datetime = Query(..., description="Start date in ISO 8601 format"),
@@ -118,27 +168,16 @@ def get_deals_by_logins(
     except Exception:
         raise HTTPException(status_code=400, detail="Invalid 'logins' parameter format")
 
-    if identifier not in mt5_managers:
-        raise HTTPException(status_code=404, detail="Manager session not found for identifier.")
-
-    manager_instance = mt5_managers[identifier]
-    if not manager_instance.connected:
-        if not manager_instance.connect():
-            raise HTTPException(
-                status_code=500,
-                detail=f"Failed to connect using session for {identifier}: {MT5Manager.LastError()}"
-            )
-
-    deals = manager_instance.manager.DealRequestByLogins(logins_list, date_from, date_to)
-    if deals is False:
-        error = f"Failed to request deals: {MT5Manager.LastError()}"
-        raise HTTPException(status_code=500, detail=error)
-    parsed_deals = [parse_deal(deal) for deal in deals]
-    return {"deals": parsed_deals}
+    manager_instance = await get_connected_manager(identifier)
+    return await _deal_history(
+        request, manager_instance, "DealRequestByLogins", [logins_list], (),
+        date_from, date_to, logins=logins_list,
+    )
 
 
 @router.get("/{identifier}/by-logins-symbol")
-def get_deals_by_logins_symbol(
+async def get_deals_by_logins_symbol(
+    request: Request,
     identifier: str,
     logins: str,
     symbol: str,
@@ -153,27 +192,15 @@ def get_deals_by_logins_symbol(
     except Exception:
         raise HTTPException(status_code=400, detail="Invalid 'logins' parameter format")
 
-    if identifier not in mt5_managers:
-        raise HTTPException(status_code=404, detail="Manager session not found for identifier.")
-
-    manager_instance = mt5_managers[identifier]
-    if not manager_instance.connected:
-        if not manager_instance.connect():
-            raise HTTPException(
-                status_code=500,
-                detail=f"Failed to connect using session for {identifier}: {MT5Manager.LastError()}"
-            )
-
-    deals = manager_instance.manager.DealRequestByLoginsSymbol(logins_list, symbol, date_from, date_to)
-    if deals is False:
-        error = f"Failed to request deals: {MT5Manager.LastError()}"
-        raise HTTPException(status_code=500, detail=error)
-    parsed_deals = [parse_deal(deal) for deal in deals]
-    return {"deals": parsed_deals}
+    manager_instance = await get_connected_manager(identifier)
+    return await _deal_history(
+        request, manager_instance, "DealRequestByLoginsSymbol", [logins_list], (symbol,),
+        date_from, date_to, logins=logins_list, symbol=symbol,
+    )
 
 
 @router.get("/{identifier}/by-tickets")
-def get_deals_by_tickets(identifier: str, tickets: str):
+async def get_deals_by_tickets(identifier: str, tickets: str):
     """
     Get deals history for the provided comma-separated deal IDs.
     This endpoint does not use date filtering.
@@ -183,27 +210,24 @@ def get_deals_by_tickets(identifier: str, tickets: str):
     except ValueError:
         raise HTTPException(status_code=400, detail="Invalid tickets format; tickets must be numeric.")
 
-    if identifier not in mt5_managers:
-        raise HTTPException(status_code=404, detail="Manager session not found for identifier.")
+    manager_instance = await get_connected_manager(identifier)
+    parsed_deals = await run_on_manager(
+        manager_instance, _request_deals, manager_instance, "DealRequestByTickets", tickets_list,
+    )
+    return {"deals": parsed_deals}
 
-    manager_instance = mt5_managers[identifier]
-    if not manager_instance.connected:
-        if not manager_instance.connect():
-            raise HTTPException(
-                status_code=500,
-                detail=f"Failed to connect using session for {identifier}: {MT5Manager.LastError()}"
-            )
 
-    deals = manager_instance.manager.DealRequestByTickets(tickets_list)
-    if deals is False:
-        error = f"Failed to request deals: {MT5Manager.LastError()}"
+def _request_deals_page(manager_instance, login: int, timestamp_from: int, timestamp_to: int, offset: int, total: int):
+    """Blocking: one DealRequestPage call, parsed. Executed on the manager's executor."""
+    deals = manager_instance.manager.DealRequestPage(login, timestamp_from, timestamp_to, offset, total)
+    if not deals:
+        error = f"Failed to request deals: {manager_instance.manager.LastError()}"
         raise HTTPException(status_code=500, detail=error)
-    parsed_deals = [parse_deal(deal) for deal in deals]
-    return {"deals": parsed_deals}
+    return [parse_deal(deal) for deal in deals]
 
 
 @router.get("/{identifier}/page")
-def get_deals_page(
+async def get_deals_page(
     identifier: str,
     login: int,
     date_from: datetime.datetime = Query(..., description="Start date in ISO 8601 format"),
@@ -215,24 +239,12 @@ def get_deals_page(
     Get paged deals history for a client (login) within a specified date range.
     Date values are converted to Unix timestamps before passing to the MT5 API.
     """
-    if identifier not in mt5_managers:
-        raise HTTPException(status_code=404, detail="Manager session not found for identifier.")
-
-    manager_instance = mt5_managers[identifier]
-    if not manager_instance.connected:
-        if not manager_instance.connect():
-            raise HTTPException(
-                status_code=500,
-                detail=f"Failed to connect using session for {identifier}: {manager_instance.manager.LastError()}"
-            )
+    manager_instance = await get_connected_manager(identifier)
 
     timestamp_from = int(date_from.timestamp())
     timestamp_to = int(date_to.timestamp())
 
-    deals = manager_instance.manager.DealRequestPage(login, timestamp_from, timestamp_to, offset, total)
-    if not deals:
-        error = f"Failed to request deals: {manager_instance.manager.LastError()}"
-        raise HTTPException(status_code=500, detail=error)
-
-    parsed_deals = [parse_deal(deal) for deal in deals]
-    return {"deals": parsed_deals}
\ No newline at end of file
+    parsed_deals = await run_on_manager(
+        manager_instance, _request_deals_page, manager_instance, login, timestamp_from, timestamp_to, offset, total,
+    )
+    return {"deals": parsed_deals}
@@ -0,0 +1,62 @@
+# app/modules/mt5_manager/routes/deps.py
+
+import asyncio
+from typing import Optional
+
+from fastapi import HTTPException
+
+from app.modules.mt5_manager.manager import MT5ManagerService, evicted_sessions, mt5_managers, restore_mt5_manager
+
+# How long (s) a request waits for the first connect of a session it just started
+FIRST_CONNECT_WAIT = 3.0
+
+
+def get_manager(identifier: str) -> MT5ManagerService:
+    """Return the manager session for `identifier` (restoring it if it was evicted) or raise 404."""
+    svc = restore_mt5_manager(identifier)
+    if svc is None:
+        raise HTTPException(status_code=404, detail="Manager session not found for identifier.")
+    return svc
+
+
+def peek_manager(identifier: str) -> Optional[MT5ManagerService]:
+    """
+    Read-only lookup: the live session for `identifier`, None if it was
+    evicted (it is not restored), or 404. Restoring belongs on paths that
+    also start the supervisor.
+    """
+    svc = mt5_managers.get(identifier)
+    if svc is None and identifier not in evicted_sessions:
+        raise HTTPException(status_code=404, detail="Manager session not found for identifier.")
+    return svc
+
+
+async def run_on_manager(svc: MT5ManagerService, fn, *args, timeout: Optional[float] = None, **kwargs):
+    """Await a blocking call on the manager's executor, mapping a timeout to 504."""
+    try:
+        return await svc.run(fn, *args, timeout=timeout, **kwargs)
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail=f"MT5 Manager call timed out for {svc.identifier}")
+
+
+async def get_connected_manager(identifier: str) -> MT5ManagerService:
+    """
+    Return the manager session for `identifier` if it is connected.
+
+    A session whose supervisor is not running yet (never started, or just
+    restored after eviction) gets it started and a few seconds to connect.
+    A session that is connecting or reconnecting fails fast with 503 and a
+    Retry-After header while its supervisor works in the background.
+    """
+    svc = get_manager(identifier)
+    if not svc.connected:
+        starting = not svc.supervised
+        svc.start_supervisor()
+        if starting:
+            await svc.wait_first_attempt(timeout=FIRST_CONNECT_WAIT)
+    if not svc.connected:
+        detail = f"Manager '{identifier}' is {svc.state}"
+        if svc.last_error:
+            detail += f": {svc.last_error}"
+        raise HTTPException(status_code=503, detail=detail, headers={"Retry-After": "5"})
+    return svc
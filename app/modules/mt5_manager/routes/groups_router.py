@@ -1,13 +1,38 @@
-from fastapi import APIRouter, HTTPException
-from app.modules.mt5_manager.groups import get_group_configurations
+from fastapi import APIRouter, HTTPException, Request, Response
+from app.modules.mt5_manager.groups import get_group_configurations_with_etag
+from app.modules.mt5_manager.routes.deps import get_connected_manager, run_on_manager
 import logging
 
 router = APIRouter(prefix="/groups")
 logger = logging.getLogger(__name__)
 
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    tags = [t.strip() for t in if_none_match.split(",")]
+    return "*" in tags or etag in tags or f"W/{etag}" in tags
+
+
 @router.get("/{identifier}/group-configurations")
-async def group_configurations(identifier: str):
-    result = get_group_configurations(identifier)
-    if "error" in result:
-        raise HTTPException(status_code=500, detail=result["error"])
+async def group_configurations(identifier: str, request: Request, response: Response):
+    """
+    Group configurations from the manager's group cache. Send the returned
+    ETag as If-None-Match to get a 304 while nothing has changed.
+    """
+    svc = await get_connected_manager(identifier)
+    try:
+        result, etag = await run_on_manager(
+            svc, get_group_configurations_with_etag, identifier, timeout=svc.HISTORY_TIMEOUT
+        )
+    except HTTPException:
+        raise
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ConnectionError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except Exception as e:
+        logger.error(f"❌ Group configurations failed for {identifier}: {repr(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+    if _etag_matches(request.headers.get("if-none-match", ""), etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    response.headers["ETag"] = etag
     return result
@@ -1,18 +1,19 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
 from datetime import datetime
-from typing import Optional, List, Dict
+from typing import Any, Dict, List, Optional
 from pydantic import BaseModel
 
 from app.db.db import get_db
-from app.models import (
-    ManagerDeal,
-    TerminalFill,
-    GroupConfig,
-    SymbolConfig,
-    FXRate
+from app.modules.mt5_manager.fx_index import fx_index
+from app.modules.mt5_manager.pnl_engine import (
+    BREAKDOWN_DIMENSIONS,
+    BREAKDOWN_SORT_KEYS,
+    compute_breakdown,
+    compute_pnl,
+    compute_pnl_vectorized,
 )
+from app.modules.mt5_manager.pnl_rollup import compute_pnl_rolled, rebuild_rollups, refresh_rollups
 
 router = APIRouter(prefix="/pnl", tags=["P&L"])
 
@@ -37,88 +38,107 @@ class PnLDetail(BaseModel):
     symbol: Optional[str]
     summary: PnLSummary
 
+class PnLBreakdown(BaseModel):
+    date_from: datetime
+    date_to: datetime
+    symbol: Optional[str]
+    by: List[str]
+    row_count: int
+    rows: List[Dict[str, Any]]
+    totals: PnLSummary
+
 async def get_fx_rate(db: AsyncSession, currency: str, dt: datetime) -> float:
     """
     Fetch the FX rate to USD at given datetime. Defaults to 1.0 if USD.
     """
-    if currency.upper() == 'USD':
-        return 1.0
-    qry = select(FXRate).where(FXRate.base == currency, FXRate.date <= dt).order_by(FXRate.date.desc())
-    result = await db.execute(qry)
-    rate_obj = result.scalars().first()
-    if not rate_obj:
+    await fx_index.refresh(db)
+    rate = fx_index.rate(currency, dt)
+    if rate is None:
         raise HTTPException(status_code=400, detail=f"FX rate for {currency} not found at {dt}")
-    return rate_obj.rate
+    return rate
 
 @router.get("/", response_model=PnLDetail)
 async def get_pnl(
     date_from: datetime,
     date_to: datetime,
     symbol: Optional[str] = None,
+    mode: str = Query(
+        "sql",
+        description="'sql' aggregates raw rows, 'rollup' uses the daily rollups plus raw edge days, "
+                    "'vectorized' computes raw rows on NumPy arrays",
+    ),
     db: AsyncSession = Depends(get_db)
 ):
-    # 1. Fetch client deals
-    deal_q = select(ManagerDeal).where(
-        ManagerDeal.open_time >= date_from,
-        ManagerDeal.close_time <= date_to
-    )
-    if symbol:
-        deal_q = deal_q.where(ManagerDeal.symbol == symbol)
-    deals_res = await db.execute(deal_q)
-    deals: List[ManagerDeal] = deals_res.scalars().all()
-
-    # 2. Fetch LP fills
-    fill_q = select(TerminalFill).where(
-        TerminalFill.time >= date_from,
-        TerminalFill.time <= date_to
+    """
+    Broker P&L summary. By default the whole range is aggregated in SQL;
+    `mode=rollup` takes whole days from the daily rollups and aggregates
+    only the partial edge days (and rows not rolled up yet) raw, and
+    `mode=vectorized` loads the deal columns into arrays and computes there.
+    """
+    if mode == "rollup":
+        summary = await compute_pnl_rolled(db, date_from, date_to, symbol)
+    elif mode == "sql":
+        summary = await compute_pnl(db, date_from, date_to, symbol)
+    elif mode == "vectorized":
+        try:
+            summary = await compute_pnl_vectorized(db, date_from, date_to, symbol)
+        except RuntimeError as e:
+            raise HTTPException(status_code=501, detail=str(e))
+    else:
+        raise HTTPException(status_code=400, detail=f"Unknown mode '{mode}'")
+    return PnLDetail(
+        date_from=date_from,
+        date_to=date_to,
+        symbol=symbol,
+        summary=PnLSummary(**summary)
     )
-    if symbol:
-        fill_q = fill_q.where(TerminalFill.symbol == symbol)
-    fills_res = await db.execute(fill_q)
-    fills: List[TerminalFill] = fills_res.scalars().all()
-
-    # 3. Load configs
-    group_cache: Dict[int, GroupConfig] = {}
-    symbol_cache: Dict[str, SymbolConfig] = {}
-
-    total_markup = total_commission = total_swap_client = 0.0
-
-    # Calculate client-side P&L and fees
-    for deal in deals:
-        sym_conf = symbol_cache.get(deal.symbol) or (symbol_cache.setdefault(deal.symbol, (await db.get(SymbolConfig, deal.symbol))))
-        grp_conf = group_cache.get(deal.group_id) or (group_cache.setdefault(deal.group_id, (await db.get(GroupConfig, deal.group_id))))
-
-        # Raw P&L in symbol currency
-        raw_pnl = (deal.close_price - deal.open_price) * deal.volume * deal.contract_size
-
-        # Spread markup revenue
-        spread_markup = (deal.open_price - deal.gateway_price) * deal.volume * deal.contract_size
-        total_markup += spread_markup
-
-        # Commission fee from group tiers
-        comm_rate = next((tier.value for tier in grp_conf.commissions if tier.range_from <= deal.volume <= tier.range_to), 0.0)
-        commission_fee = comm_rate * deal.volume
-        total_commission += commission_fee
 
-        # Swap (financing)
-        swap_rate = grp_conf.swap_long if deal.action == 'Buy' else grp_conf.swap_short
-        swap_fee = swap_rate * deal.volume
-        total_swap_client += swap_fee
 
-    # 4. Calculate LP-side cost
-    total_lp_cost = sum((f.profit + f.swap + f.commission) for f in fills)
-
-    broker_pnl = total_markup + total_commission - total_lp_cost
-
-    return PnLDetail(
+@router.get("/breakdown", response_model=PnLBreakdown)
+async def get_pnl_breakdown(
+    date_from: datetime,
+    date_to: datetime,
+    by: str = Query("symbol", description="Comma-separated dimensions: symbol, group, login, day"),
+    symbol: Optional[str] = None,
+    sort: str = Query("broker_pnl", description="Row field to sort by"),
+    order: str = Query("desc", pattern="^(asc|desc)$"),
+    top: int = Query(100, ge=1, le=10000),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    P&L broken down by any combination of symbol, group, login and day
+    (close day), computed in one aggregation: the top-N rows by `sort`,
+    plus totals over the whole range.
+    """
+    dims = [d.strip() for d in by.split(",") if d.strip()]
+    unknown = [d for d in dims if d not in BREAKDOWN_DIMENSIONS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown breakdown dimension(s): {', '.join(unknown)}")
+    if sort not in BREAKDOWN_SORT_KEYS:
+        raise HTTPException(status_code=400, detail=f"Cannot sort by '{sort}'")
+
+    breakdown = await compute_breakdown(
+        db, date_from, date_to, dims, symbol,
+        sort=sort, descending=order == "desc", top=top,
+    )
+    return PnLBreakdown(
         date_from=date_from,
         date_to=date_to,
         symbol=symbol,
-        summary=PnLSummary(
-            total_markup=total_markup,
-            total_commission=total_commission,
-            total_swap_client=total_swap_client,
-            total_lp_cost=total_lp_cost,
-            broker_pnl=broker_pnl
-        )
+        by=dims,
+        row_count=breakdown["row_count"],
+        rows=breakdown["rows"],
+        totals=PnLSummary(**breakdown["totals"]),
     )
+
+
+@router.post("/rollups/refresh")
+async def refresh_pnl_rollups(
+    rebuild: bool = Query(False, description="Recompute from scratch, e.g. after tier or swap changes"),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Fold new deals and fills into the daily P&L rollups.
+    """
+    deals, fills = await (rebuild_rollups(db) if rebuild else refresh_rollups(db))
+    return {"deals": deals, "fills": fills}
@@ -1,5 +1,7 @@
-from fastapi import APIRouter, WebSocket, WebSocketDisconnect
-from app.modules.mt5_manager.manager import mt5_managers
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Query
+from typing import Optional
+from app.modules.mt5_manager.manager import mt5_managers, restore_mt5_manager
+from app.modules.mt5_manager.routes.deps import get_connected_manager
 import  logging
 
 # ✅ Create a separate router for positions
@@ -9,22 +11,31 @@ logger = logging.getLogger(__name__)
 
 # ✅ WebSocket endpoint for streaming live positions
 @router.websocket("/ws/{identifier}")
-async def websocket_positions(websocket: WebSocket, identifier: str):
+async def websocket_positions(
+    websocket: WebSocket,
+    identifier: str,
+    mode: str = Query("full", description="'full' resends the whole list, 'delta' sends a snapshot then changes"),
+):
     """
     WebSocket for streaming live positions for a specific MT5 Manager instance.
     """
     logger.info(f"🔵 Attempting WebSocket connection: {identifier}")
 
-    if identifier not in mt5_managers:
+    manager_instance = restore_mt5_manager(identifier)
+    if manager_instance is None:
         await websocket.close()
         logger.warning(f"❌ WebSocket rejected: Manager instance '{identifier}' not found.")
         return
 
     await websocket.accept()  # ✅ Ensure WebSocket is explicitly accepted
+    manager_instance.start_supervisor()
     logger.info(f"✅ WebSocket connected: {identifier}")
 
     try:
-        await mt5_managers[identifier].subscribe_to_positions(websocket)
+        if mode == "delta":
+            await manager_instance.stream_position_deltas(websocket)
+        else:
+            await manager_instance.subscribe_to_positions(websocket)
     except WebSocketDisconnect:
         logger.warning(f"🔴 WebSocket disconnected: {identifier}")
     finally:
@@ -33,14 +44,17 @@ async def websocket_positions(websocket: WebSocket, identifier: str):
 
 # ✅ REST API to fetch latest positions for a specific instance
 @router.get("/{identifier}/latest")
-def get_latest_positions(identifier: str):
+async def get_latest_positions(
+    identifier: str,
+    login: Optional[int] = Query(None, description="Only positions of this login"),
+    symbol: Optional[str] = Query(None, description="Only positions on this symbol"),
+):
     """
     Retrieve the latest open positions for a specific MT5 Manager instance.
+    Served from the in-memory position book kept current by the positions pump.
     """
-    if identifier not in mt5_managers:
-        return {"error": "Manager instance not found."}
-
-    return mt5_managers[identifier].get_latest_positions()
+    manager_instance = await get_connected_manager(identifier)
+    return manager_instance.get_latest_positions(login=login, symbol=symbol)
 
 
 # ✅ REST API to fetch positions by group
@@ -1,63 +1,52 @@
 # app/modules/mt5_manager/symbols_router.py
 
-import MT5Manager
 import logging
-from fastapi import APIRouter, HTTPException
-from typing import Any, Dict, List
+from fastapi import APIRouter, HTTPException, Query
 
-from app.modules.mt5_manager.manager import mt5_managers
+from app.modules.mt5_manager.manager import MT5ManagerService
+from app.modules.mt5_manager.routes.deps import get_connected_manager, run_on_manager
+from app.modules.mt5_manager.symbol_cache import SymbolCache
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/symbols", tags=["symbols"])
 
 
+async def _symbol_cache(identifier: str) -> SymbolCache:
+    """The manager's symbol cache, loaded on first use (and after a symbol resync)."""
+    # get_connected_manager restores the session (or 404s) and ensures it is connected
+    svc: MT5ManagerService = await get_connected_manager(identifier)
+    if not svc.symbol_cache.loaded:
+        await run_on_manager(svc, svc.load_symbol_cache)
+    return svc.symbol_cache
+
+
 @router.get("/{identifier}", summary="List all symbol configurations")
-def list_symbols(identifier: str):
+async def list_symbols(identifier: str):
     """
     Retrieve and return all symbol configurations from an MT5 Manager instance.
     """
-    # 1) Validate
-    if identifier not in mt5_managers:
-        logger.warning(f"Symbols request for unknown identifier: {identifier}")
-        raise HTTPException(status_code=404, detail="Manager instance not found")
-
-    svc = mt5_managers[identifier]
-
-    # 2) Ensure connected
-    if not svc.connected:
-        logger.debug(f"Connecting MT5ManagerService for identifier {identifier}")
-        if not svc.connect():
-            err = MT5Manager.LastError()
-            logger.error(f"Failed to connect for {identifier}: {err}")
-            raise HTTPException(
-                status_code=500,
-                detail=f"Failed to connect MT5 Manager: {err}"
-            )
-
-    # 3) Fetch total symbol count
-    total = svc.manager.SymbolTotal()
-    if total is False or total <= 0:
-        return {"count": 0, "symbols": []}
-
-    symbols: List[Dict[str, Any]] = []
-
-    # 4) Enumerate every symbol by index
-    for idx in range(total):
-        sym = svc.manager.SymbolNext(idx)
-        if not sym:
-            logger.warning(f"SymbolNext returned None at index {idx}")
-            continue
-
-        # 5) Extract all non-private, non-callable attributes
-        info: Dict[str, Any] = {}
-        for attr in dir(sym):
-            if attr.startswith("_"):
-                continue
-            value = getattr(sym, attr)
-            if callable(value):
-                continue
-            info[attr] = value
-
-        symbols.append(info)
+    symbols = (await _symbol_cache(identifier)).all()
+    return {"count": len(symbols), "symbols": symbols}
 
+
+@router.get("/{identifier}/by-path", summary="List symbol configurations under a path")
+async def list_symbols_by_path(
+    identifier: str,
+    path: str = Query(..., description="Symbol path prefix, e.g. 'Forex\\Majors' or 'Forex/Majors'"),
+):
+    """
+    Symbol configurations whose path starts with `path` (case-insensitive).
+    """
+    symbols = (await _symbol_cache(identifier)).by_path(path)
     return {"count": len(symbols), "symbols": symbols}
+
+
+@router.get("/{identifier}/symbol/{symbol}", summary="Get one symbol configuration")
+async def get_symbol(identifier: str, symbol: str):
+    """
+    Configuration of a single symbol by name.
+    """
+    config = (await _symbol_cache(identifier)).get(symbol)
+    if config is None:
+        raise HTTPException(status_code=404, detail=f"Symbol '{symbol}' not found")
+    return config
@@ -1,6 +1,8 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from fastapi import APIRouter, HTTPException, Query
-from app.modules.mt5_manager.users import fetch_users
+from app.modules.mt5_manager.user_directory import UserDirectory
+from app.modules.mt5_manager.users import fetch_users, get_user_directory
+from app.modules.mt5_manager.routes.deps import get_connected_manager, run_on_manager
 
 router = APIRouter(
     prefix="/users",
@@ -9,15 +11,18 @@ router = APIRouter(
 )
 
 @router.get("/{identifier}", response_model=List[Dict[str, Any]])
-def get_users(
+async def get_users(
     identifier: str,
     group: str = Query("*", description="Group name to filter users. Use '*' for all groups.")
 ):
     """
     Retrieve users for a given MT5 Manager instance, optionally filtered by group.
     """
+    svc = await get_connected_manager(identifier)
     try:
-        return fetch_users(identifier, group)
+        return await run_on_manager(svc, fetch_users, identifier, group)
+    except HTTPException:
+        raise
     except ValueError as ve:
         raise HTTPException(status_code=404, detail=str(ve))
     except ConnectionError as ce:
@@ -25,4 +30,50 @@ def get_users(
     except RuntimeError as re:
         raise HTTPException(status_code=500, detail=str(re))
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Unexpected error: {e}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Unexpected error: {e}")
+
+async def _user_directory(identifier: str) -> UserDirectory:
+    svc = await get_connected_manager(identifier)
+    if svc.user_directory.loaded:
+        return svc.user_directory
+    try:
+        return await run_on_manager(svc, get_user_directory, svc)
+    except RuntimeError as re:
+        raise HTTPException(status_code=500, detail=str(re))
+
+
+@router.get("/{identifier}/page")
+async def get_users_page(
+    identifier: str,
+    group: Optional[str] = Query(None, description="Exact group name"),
+    search: Optional[str] = Query(None, description="Matches login, name or email"),
+    offset: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+):
+    """
+    One page of users from the in-memory user directory, in login order.
+    """
+    directory = await _user_directory(identifier)
+    total, users = directory.page(group=group, search=search, offset=offset, limit=limit)
+    return {"total": total, "offset": offset, "limit": limit, "users": users}
+
+
+@router.get("/{identifier}/groups")
+async def get_user_groups(identifier: str):
+    """
+    Number of users per group.
+    """
+    directory = await _user_directory(identifier)
+    return directory.group_counts()
+
+
+@router.get("/{identifier}/login/{login}")
+async def get_user(identifier: str, login: int):
+    """
+    A single user by login.
+    """
+    directory = await _user_directory(identifier)
+    user = directory.get(login)
+    if user is None:
+        raise HTTPException(status_code=404, detail=f"User {login} not found")
+    return user
@@ -0,0 +1,64 @@
+# app/modules/mt5_manager/serializers.py
+
+from operator import attrgetter
+from typing import Any, Callable, Dict, Iterable, List, Tuple
+
+# SDK class -> (public data field names, accessor returning their values as a tuple)
+_accessors: Dict[type, Tuple[Tuple[str, ...], Callable[[Any], tuple]]] = {}
+
+
+def _discover(obj) -> Tuple[str, ...]:
+    """Public, non-callable attributes of `obj`; run once per SDK class."""
+    fields = []
+    for attr in dir(obj):
+        if attr.startswith("_"):
+            continue
+        try:
+            value = getattr(obj, attr)
+        except Exception:
+            value = None
+        if not callable(value):
+            fields.append(attr)
+    return tuple(fields)
+
+
+def _accessor(obj) -> Tuple[Tuple[str, ...], Callable[[Any], tuple]]:
+    cls = type(obj)
+    cached = _accessors.get(cls)
+    if cached is None:
+        fields = _discover(obj)
+        if not fields:
+            fetch = lambda o: ()
+        elif len(fields) == 1:
+            getter = attrgetter(fields[0])
+            fetch = lambda o: (getter(o),)
+        else:
+            fetch = attrgetter(*fields)
+        cached = _accessors[cls] = (fields, fetch)
+    return cached
+
+
+def _fetch_each(obj, fields: Tuple[str, ...]) -> tuple:
+    # slow path for an object whose getters raise: failing fields become None
+    values = []
+    for attr in fields:
+        try:
+            values.append(getattr(obj, attr))
+        except Exception:
+            values.append(None)
+    return tuple(values)
+
+
+def to_dict(obj) -> Dict[str, Any]:
+    """All public data fields of an MT5 SDK object (MTUser, MTConSymbol, ...) as a dict."""
+    fields, fetch = _accessor(obj)
+    try:
+        values = fetch(obj)
+    except Exception:
+        values = _fetch_each(obj, fields)
+    return dict(zip(fields, values))
+
+
+def to_dicts(objs: Iterable[Any]) -> List[Dict[str, Any]]:
+    """`to_dict` over a batch; the field plan is looked up once per class."""
+    return [to_dict(obj) for obj in objs]
@@ -0,0 +1,185 @@
+# app/modules/mt5_manager/sessions.py
+
+import asyncio
+import json
+import logging
+import os
+import time
+from typing import Any, Dict, List, Optional
+
+from app.modules.mt5_manager.admin_pool import admin_pool
+from app.modules.mt5_manager.manager import evicted_sessions, get_or_create_mt5_manager, mt5_managers
+
+logger = logging.getLogger(__name__)
+
+# JSON list of {"identifier", "server", "login", "password" | "password_env"}
+SESSIONS_CONFIG = os.getenv("MT5_MANAGER_SESSIONS", "manager_sessions.json")
+
+
+def load_session_config(path: str = SESSIONS_CONFIG) -> List[Dict[str, Any]]:
+    """
+    Read the manager-session config. A missing file means no sessions.
+    `password_env` names an environment variable holding the password, so
+    the file itself can be kept free of secrets.
+    """
+    if not os.path.exists(path):
+        logger.info(f"No manager session config at {path}, skipping auto-connect.")
+        return []
+
+    with open(path, encoding="utf-8") as f:
+        entries = json.load(f)
+
+    sessions = []
+    for entry in entries:
+        password = entry.get("password")
+        if password is None and entry.get("password_env"):
+            password = os.getenv(entry["password_env"])
+        if (not entry.get("identifier") or not entry.get("server") or entry.get("login") is None
+                or password is None):
+            logger.error(f"Skipping incomplete manager session entry: {entry.get('identifier')!r}")
+            continue
+        try:
+            login = int(entry["login"])
+        except (TypeError, ValueError):
+            logger.error(f"Skipping manager session entry {entry['identifier']!r}: invalid login {entry['login']!r}")
+            continue
+        sessions.append({
+            "identifier": entry["identifier"],
+            "server": entry["server"],
+            "login": login,
+            "password": password,
+        })
+    return sessions
+
+
+async def start_configured_sessions(path: str = SESSIONS_CONFIG) -> int:
+    """
+    Create every configured session and hand it to its supervisor.
+
+    Does not wait for any Connect: all sessions connect concurrently on
+    their own executors while the HTTP server is already serving.
+    """
+    start_session_reaper()
+    sessions = load_session_config(path)
+    for cfg in sessions:
+        manager = get_or_create_mt5_manager(cfg["identifier"], cfg["server"], cfg["login"], cfg["password"])
+        manager.pinned = not EVICT_CONFIGURED_SESSIONS
+        manager.start_supervisor()
+    if sessions:
+        logger.info(f"✅ Started {len(sessions)} manager sessions from {path}")
+    return len(sessions)
+
+
+async def stop_all_sessions():
+    """Stop supervisors and disconnect every session (application shutdown)."""
+    await stop_session_reaper()
+    for identifier in list(mt5_managers):
+        manager = mt5_managers.pop(identifier)
+        await manager.stop_supervisor()
+        try:
+            await manager.run(manager.close, timeout=manager.CONNECT_TIMEOUT)
+        except Exception as e:
+            logger.error(f"Error closing manager {identifier}: {repr(e)}")
+
+
+def session_readiness() -> Dict[str, Any]:
+    """Per-session state plus an overall ready flag (every session connected)."""
+    sessions = {
+        identifier: {"state": manager.state, "connected": manager.connected, "last_error": manager.last_error}
+        for identifier, manager in mt5_managers.items()
+    }
+    return {
+        "ready": all(s["connected"] for s in sessions.values()),
+        "sessions": sessions,
+    }
+
+
+# ——— Idle session eviction ———
+
+# Upper bound on live sessions, and idle time (s) after which a session without
+# websocket subscribers or calls in flight is disconnected. Evicted sessions
+# reconnect on next use. Sessions from the startup config are kept unless
+# MT5_EVICT_CONFIGURED_SESSIONS is set.
+MAX_LIVE_SESSIONS = int(os.getenv("MT5_MAX_LIVE_SESSIONS", "32"))
+SESSION_IDLE_TIMEOUT = float(os.getenv("MT5_SESSION_IDLE_TIMEOUT", "3600"))
+EVICT_CONFIGURED_SESSIONS = os.getenv("MT5_EVICT_CONFIGURED_SESSIONS", "0").lower() in ("1", "true", "yes")
+EVICTION_INTERVAL = 60.0
+
+_reaper: Optional[asyncio.Task] = None
+
+
+def eviction_candidates(now: float) -> List[str]:
+    """
+    Sessions to evict, least recently used first: every idle-expired session
+    that is not busy (subscribers, calls in flight or a connect under way),
+    then more LRU idle sessions until the live count fits MAX_LIVE_SESSIONS.
+    Pinned sessions are never evicted.
+    """
+    idle = sorted(
+        (m.last_used, identifier)
+        for identifier, m in mt5_managers.items()
+        if not m.busy and not m.pinned
+    )
+    victims = [identifier for last_used, identifier in idle if now - last_used >= SESSION_IDLE_TIMEOUT]
+    excess = len(mt5_managers) - len(victims) - MAX_LIVE_SESSIONS
+    for _, identifier in idle:
+        if excess <= 0:
+            break
+        if identifier not in victims:
+            victims.append(identifier)
+            excess -= 1
+    return victims
+
+
+async def evict_session(identifier: str):
+    """Disconnect a session but keep its credentials so it can be restored."""
+    manager = mt5_managers.get(identifier)
+    if manager is None or manager.busy:
+        return
+    del mt5_managers[identifier]
+    evicted_sessions[identifier] = (manager.server, manager.login, manager.password)
+    await manager.stop_supervisor()
+    try:
+        await manager.run(manager.close, timeout=manager.CONNECT_TIMEOUT)
+    except Exception as e:
+        logger.error(f"Error closing evicted manager {identifier}: {repr(e)}")
+    logger.info(f"🧹 Evicted idle manager session {identifier}")
+
+
+async def evict_idle_sessions() -> List[str]:
+    victims = eviction_candidates(time.monotonic())
+    for identifier in victims:
+        await evict_session(identifier)
+    return victims
+
+
+async def _reap_forever():
+    """Evict idle manager sessions and close idle pooled AdminAPI sessions, every EVICTION_INTERVAL."""
+    while True:
+        await asyncio.sleep(EVICTION_INTERVAL)
+        try:
+            await evict_idle_sessions()
+        except Exception as e:
+            logger.error(f"Session eviction failed: {repr(e)}")
+        try:
+            # AdminAPI Disconnect blocks: keep it off the event loop
+            await asyncio.get_running_loop().run_in_executor(None, admin_pool.expire_idle)
+        except Exception as e:
+            logger.error(f"AdminAPI session expiry failed: {repr(e)}")
+
+
+def start_session_reaper():
+    global _reaper
+    if _reaper is None or _reaper.done():
+        _reaper = asyncio.get_running_loop().create_task(_reap_forever())
+
+
+async def stop_session_reaper():
+    global _reaper
+    if _reaper is not None:
+        _reaper.cancel()
+        try:
+            await _reaper
+        except asyncio.CancelledError:
+            pass
+        _reaper = None
@@ -0,0 +1,111 @@
+# app/modules/mt5_manager/streams.py
+
+import asyncio
+import logging
+import threading
+from collections import deque
+from itertools import islice
+from typing import Any, Deque, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class Broadcaster:
+    """
+    Fan-out hub between MT5 SDK callback threads and websocket clients.
+
+    Producers call `publish()` from any thread; the item is handed to the
+    event loop once and then pushed into the private queue of every
+    subscriber, so each connected client sees every item.
+    """
+
+    def __init__(self, name: str, max_queue: int = 10000):
+        self.name = name
+        self.max_queue = max_queue
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queues: Set[asyncio.Queue] = set()
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._queues)
+
+    def subscribe(self) -> asyncio.Queue:
+        """Register a new subscriber queue. Must be called from the event loop."""
+        self._loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.max_queue)
+        self._queues.add(queue)
+        logger.debug(f"{self.name}: subscriber added ({len(self._queues)} total)")
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        self._queues.discard(queue)
+        logger.debug(f"{self.name}: subscriber removed ({len(self._queues)} total)")
+
+    def publish(self, item: Any):
+        """Thread-safe: schedule delivery of `item` to every subscriber."""
+        loop = self._loop
+        if loop is None or not self._queues:
+            return
+        try:
+            loop.call_soon_threadsafe(self._fanout, item)
+        except RuntimeError:
+            # event loop already closed (shutdown in progress)
+            self._loop = None
+
+    def _fanout(self, item: Any):
+        for queue in list(self._queues):
+            try:
+                queue.put_nowait(item)
+            except asyncio.QueueFull:
+                # slow client: drop its oldest item rather than block everybody
+                queue.get_nowait()
+                queue.put_nowait(item)
+                logger.warning(f"{self.name}: subscriber queue full, dropped oldest item")
+
+
+def drain(queue: asyncio.Queue, first: Any) -> list:
+    """Return `first` plus everything already waiting in `queue`."""
+    items = [first]
+    while True:
+        try:
+            items.append(queue.get_nowait())
+        except asyncio.QueueEmpty:
+            return items
+
+
+class SequencedRing:
+    """
+    Bounded, thread-safe buffer of the most recent items, each tagged with a
+    monotonically increasing sequence number so readers can resume from the
+    last one they saw.
+    """
+
+    def __init__(self, capacity: int):
+        self._lock = threading.Lock()
+        self._items: Deque[Tuple[int, Any]] = deque(maxlen=capacity)
+        self.last_seq = 0
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def append(self, item: Any) -> int:
+        with self._lock:
+            self.last_seq += 1
+            self._items.append((self.last_seq, item))
+            return self.last_seq
+
+    def since(self, seq: int) -> Tuple[List[Tuple[int, Any]], bool]:
+        """
+        Return the (seq, item) pairs newer than `seq`, and whether items the
+        caller had not seen were already evicted from the buffer.
+
+        A `seq` beyond `last_seq` comes from an earlier incarnation of the
+        buffer (process restart, session evicted and restored); it is treated
+        as a reset: everything buffered is returned and flagged truncated.
+        """
+        with self._lock:
+            if seq > self.last_seq:
+                return list(self._items), True
+            oldest = self._items[0][0] if self._items else self.last_seq + 1
+            items = list(islice(self._items, max(0, seq + 1 - oldest), None))
+            return items, seq + 1 < oldest and seq < self.last_seq
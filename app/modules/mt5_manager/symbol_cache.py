@@ -0,0 +1,124 @@
+# app/modules/mt5_manager/symbol_cache.py
+
+import threading
+from bisect import bisect_left, insort
+from typing import Callable, Dict, List, Optional, Tuple
+
+
+def _path_key(path: Optional[str]) -> str:
+    """Symbol paths compare case-insensitively, with '/' accepted for '\\'."""
+    return (path or "").replace("/", "\\").lower()
+
+
+class SymbolCache:
+    """
+    In-memory symbol configurations of one manager, indexed by name and by
+    path (sorted, so a path prefix is a bisect range instead of a scan).
+
+    Filled in one go by `refresh()` and kept current by the symbol sink
+    through `upsert()` / `remove()`. `invalidate()` asks for a reload on next
+    use; one that arrives while a load is running makes that load count as
+    stale. Sink changes made during a load are replayed over its snapshot.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()  # one refresh() at a time
+        self._by_name: Dict[str, dict] = {}
+        self._paths: List[Tuple[str, str]] = []  # sorted (path key, name)
+        self._generation = 0  # bumped by invalidate()
+        self._journal: Optional[List[Tuple[str, object]]] = None  # sink changes during a load
+        self.loaded = False
+
+    def __len__(self) -> int:
+        return len(self._by_name)
+
+    def invalidate(self):
+        with self._lock:
+            self._generation += 1
+            self.loaded = False
+
+    def refresh(self, fetch: Callable[[], List[dict]]) -> bool:
+        """Blocking: reload from `fetch()` unless already loaded. True if a load ran."""
+        with self._load_lock:
+            if self.loaded:
+                return False
+            with self._lock:
+                generation = self._generation
+                self._journal = []
+            try:
+                symbols = fetch()
+            except BaseException:
+                with self._lock:
+                    self._journal = None
+                raise
+            self.load(symbols, generation)
+            return True
+
+    def load(self, symbols: List[dict], generation: Optional[int] = None):
+        by_name = {s["Symbol"]: s for s in symbols}
+        paths = sorted((_path_key(s.get("Path")), name) for name, s in by_name.items())
+        with self._lock:
+            journal, self._journal = self._journal or [], None
+            self._by_name = by_name
+            self._paths = paths
+            for op, arg in journal:
+                if op == "upsert":
+                    self._upsert(arg)
+                else:
+                    self._remove(arg)
+            self.loaded = generation is None or generation == self._generation
+
+    def upsert(self, symbol: dict):
+        with self._lock:
+            if self._journal is not None:
+                self._journal.append(("upsert", symbol))
+            self._upsert(symbol)
+
+    def remove(self, name: str):
+        with self._lock:
+            if self._journal is not None:
+                self._journal.append(("remove", name))
+            self._remove(name)
+
+    def _upsert(self, symbol: dict):
+        name = symbol["Symbol"]
+        old = self._by_name.get(name)
+        if old is not None:
+            self._drop_path(old)
+        self._by_name[name] = symbol
+        insort(self._paths, (_path_key(symbol.get("Path")), name))
+
+    def _remove(self, name: str):
+        old = self._by_name.pop(name, None)
+        if old is not None:
+            self._drop_path(old)
+
+    def _drop_path(self, symbol: dict):
+        entry = (_path_key(symbol.get("Path")), symbol["Symbol"])
+        i = bisect_left(self._paths, entry)
+        if i < len(self._paths) and self._paths[i] == entry:
+            del self._paths[i]
+
+    def get(self, name: str) -> Optional[dict]:
+        return self._by_name.get(name)
+
+    def all(self) -> List[dict]:
+        with self._lock:
+            return list(self._by_name.values())
+
+    def by_path(self, prefix: str) -> List[dict]:
+        """
+        Symbols at or under the path `prefix` (e.g. "Forex\\Majors"), in path
+        order. Whole segments only: "Forex" does not match "Forex2\\X".
+        """
+        key = _path_key(prefix).rstrip("\\")
+        with self._lock:
+            start = bisect_left(self._paths, (key, ""))
+            result = []
+            for path, name in self._paths[start:]:
+                if not path.startswith(key):
+                    break
+                if path == key or path[len(key)] == "\\" or not key:
+                    result.append(self._by_name[name])
+            return result
@@ -1,7 +1,10 @@
 from fastapi import APIRouter, HTTPException, Query
 from pydantic import BaseModel
 from typing import Any, Dict, List
-import MT5Manager
+import time
+
+from app.modules.mt5_manager.admin_pool import ADMIN_SYMBOLS_TTL, admin_pool
+from app.modules.mt5_manager.serializers import to_dict
 
 router = APIRouter(
     prefix="/mt5‑manager",
@@ -29,38 +32,39 @@ def list_manager_symbols(
     login: int = Query(..., description="Manager login ID"),
     password: str = Query(..., description="Manager password"),
     timeout: int = Query(3000, description="Connection timeout in milliseconds"),
+    refresh: bool = Query(False, description="Bypass the cached symbol dump"),
 ):
     """
-    Connects to the MT5 Manager Administrator API and returns all symbol configurations.
+    Returns all symbol configurations through the Administrator API.
+    Connections are pooled per host+login and the symbol dump is cached
+    on the connection for ADMIN_SYMBOLS_TTL seconds.
     """
-    admin = MT5Manager.AdminAPI()
-    # the 4th parameter is reserved—must be 0
-    if not admin.Connect(host, login, password, 0, timeout):
-        err = MT5Manager.LastError()
-        raise HTTPException(status_code=500, detail=f"Connection failed: {err}")
-
     try:
-        total = admin.SymbolTotal()
-        symbols = []
+        with admin_pool.session(host, login, password, timeout) as session:
+            if refresh or session.symbols is None or time.monotonic() - session.symbols_at >= ADMIN_SYMBOLS_TTL:
+                session.symbols = _dump_symbols(session.admin)
+                session.symbols_at = time.monotonic()
+            symbols = session.symbols
+    except ConnectionError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    return SymbolListResponse(
+        count=len(symbols),
+        symbols=[SymbolConfig(attributes=data) for data in symbols],
+    )
+
 
-        for idx in range(total):
-            cfg = admin.SymbolNext(idx)
-            if not cfg:
-                # skip if for some reason it returned None
-                continue
+def _dump_symbols(admin) -> List[Dict[str, Any]]:
+    total = admin.SymbolTotal()
+    symbols = []
 
-            # pull out all public, non‐callable attributes
-            data: Dict[str, Any] = {}
-            for attr in dir(cfg):
-                if attr.startswith("_"):
-                    continue
-                val = getattr(cfg, attr)
-                if callable(val):
-                    continue
-                data[attr] = val
-            symbols.append(SymbolConfig(attributes=data))
+    for idx in range(total):
+        cfg = admin.SymbolNext(idx)
+        if not cfg:
+            # skip if for some reason it returned None
+            continue
 
-        return SymbolListResponse(count=len(symbols), symbols=symbols)
+        # pull out all public, non‐callable attributes
+        symbols.append(to_dict(cfg))
 
-    finally:
-        admin.Disconnect()
+    return symbols
@@ -0,0 +1,161 @@
+# app/modules/mt5_manager/user_directory.py
+
+import threading
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+
+def _group_key(group: Optional[str]) -> str:
+    """Group names compare case-insensitively, as in MT5 group masks."""
+    return (group or "").lower()
+
+
+class UserDirectory:
+    """
+    In-memory user records of one manager (serialized MTUser objects),
+    indexed by login and by group.
+
+    Filled in one go by `refresh()` and kept current by the user sink
+    through `upsert()` / `remove()`. `invalidate()` asks for a reload on next
+    use; one that arrives while a load is running makes that load count as
+    stale. Sink changes made during a load are replayed over its snapshot.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()  # one refresh() at a time
+        self._by_login: Dict[int, Dict[str, Any]] = {}
+        self._by_group: Dict[str, Set[int]] = {}
+        self._order: Optional[List[int]] = None  # sorted logins, rebuilt lazily after adds/removes
+        self._generation = 0  # bumped by invalidate()
+        self._journal: Optional[List[Tuple[str, Any]]] = None  # sink changes during a load
+        self.loaded = False
+
+    def __len__(self) -> int:
+        return len(self._by_login)
+
+    def invalidate(self):
+        with self._lock:
+            self._generation += 1
+            self.loaded = False
+
+    def refresh(self, fetch: Callable[[], List[Dict[str, Any]]]) -> bool:
+        """Blocking: reload from `fetch()` unless already loaded. True if a load ran."""
+        with self._load_lock:
+            if self.loaded:
+                return False
+            with self._lock:
+                generation = self._generation
+                self._journal = []
+            try:
+                users = fetch()
+            except BaseException:
+                with self._lock:
+                    self._journal = None
+                raise
+            self.load(users, generation)
+            return True
+
+    def load(self, users: List[Dict[str, Any]], generation: Optional[int] = None):
+        by_login = {u["Login"]: u for u in users}
+        by_group: Dict[str, Set[int]] = {}
+        for login, user in by_login.items():
+            by_group.setdefault(_group_key(user.get("Group")), set()).add(login)
+        with self._lock:
+            journal, self._journal = self._journal or [], None
+            self._by_login = by_login
+            self._by_group = by_group
+            self._order = None
+            for op, arg in journal:
+                if op == "upsert":
+                    self._upsert(arg)
+                else:
+                    self._remove(arg)
+            self.loaded = generation is None or generation == self._generation
+
+    def upsert(self, user: Dict[str, Any]):
+        with self._lock:
+            if self._journal is not None:
+                self._journal.append(("upsert", user))
+            self._upsert(user)
+
+    def remove(self, login: int):
+        with self._lock:
+            if self._journal is not None:
+                self._journal.append(("remove", login))
+            self._remove(login)
+
+    def _upsert(self, user: Dict[str, Any]):
+        login = user["Login"]
+        old = self._by_login.get(login)
+        if old is None:
+            self._order = None
+        elif _group_key(old.get("Group")) != _group_key(user.get("Group")):
+            self._unindex(login, old.get("Group"))
+        self._by_login[login] = user
+        self._by_group.setdefault(_group_key(user.get("Group")), set()).add(login)
+
+    def _remove(self, login: int):
+        old = self._by_login.pop(login, None)
+        if old is not None:
+            self._unindex(login, old.get("Group"))
+            self._order = None
+
+    def _unindex(self, login: int, group: Optional[str]):
+        key = _group_key(group)
+        members = self._by_group.get(key)
+        if members is not None:
+            members.discard(login)
+            if not members:
+                del self._by_group[key]
+
+    # ——— lookups ———
+
+    def get(self, login: int) -> Optional[Dict[str, Any]]:
+        return self._by_login.get(login)
+
+    def logins(self, group: str) -> List[int]:
+        """Logins of one group (exact name, any case), sorted."""
+        with self._lock:
+            return sorted(self._by_group.get(_group_key(group), ()))
+
+    def group_counts(self) -> Dict[str, int]:
+        """Number of users per group."""
+        with self._lock:
+            counts = Counter(u.get("Group") for u in self._by_login.values())
+        return dict(sorted(counts.items(), key=lambda c: str(c[0])))
+
+    def all(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return list(self._by_login.values())
+
+    def page(
+        self,
+        group: Optional[str] = None,
+        search: Optional[str] = None,
+        offset: int = 0,
+        limit: int = 100,
+    ) -> Tuple[int, List[Dict[str, Any]]]:
+        """
+        (total matches, one page of users) in login order. `group` is an exact
+        group name (any case); `search` matches login, name or email, case-insensitively.
+        """
+        with self._lock:
+            if group is not None:
+                logins = sorted(self._by_group.get(_group_key(group), ()))
+            else:
+                if self._order is None:
+                    self._order = sorted(self._by_login)
+                logins = self._order
+            if not search:
+                return len(logins), [self._by_login[login] for login in logins[offset:offset + limit]]
+            users = [self._by_login[login] for login in logins]
+
+        needle = search.lower()
+        users = [
+            u for u in users
+            if needle in str(u.get("Login", "")).lower()
+            or needle in str(u.get("Name", "")).lower()
+            or needle in str(u.get("EMail", u.get("Email", ""))).lower()
+        ]
+        return len(users), users[offset:offset + limit]
@@ -2,6 +2,8 @@
 
 from typing import List, Dict, Any
 from app.modules.mt5_manager.manager import mt5_managers
+from app.modules.mt5_manager.serializers import to_dicts
+from app.modules.mt5_manager.user_directory import UserDirectory
 import MT5Manager
 
 def fetch_users(identifier: str, group: str = "*") -> List[Dict[str, Any]]:
@@ -14,21 +16,24 @@ def fetch_users(identifier: str, group: str = "*") -> List[Dict[str, Any]]:
     manager_service = mt5_managers[identifier]
 
     if not manager_service.connected:
-        if not manager_service.connect():
-            raise ConnectionError(f"Failed to connect using session for {identifier}: {MT5Manager.LastError()}")
+        raise ConnectionError(f"Manager '{identifier}' is {manager_service.state}")
+
+    # "*" and plain group names are answered by the user directory; masks go to the server
+    if group == "*" or not any(c in group for c in "*?!,"):
+        directory = get_user_directory(manager_service)
+        if group == "*":
+            return directory.all()
+        return [user for user in map(directory.get, directory.logins(group)) if user is not None]
 
     users = manager_service.manager.UserGetByGroup(group)
     if users is False:
         raise RuntimeError(f"Failed to fetch users: {MT5Manager.LastError()}")
 
-    results: List[Dict[str, Any]] = []
-    for user in users:
-        attrs = [
-            attr for attr in dir(user)
-            if not attr.startswith("_")
-            and not callable(getattr(user, attr))
-        ]
-        record: Dict[str, Any] = {attr: getattr(user, attr) for attr in attrs}
-        results.append(record)
-
-    return results
+    return to_dicts(users)
+
+
+def get_user_directory(manager_service) -> UserDirectory:
+    """Blocking: the manager's user directory, loaded on first use (and after a user resync)."""
+    if not manager_service.user_directory.loaded:
+        manager_service.load_user_directory()
+    return manager_service.user_directory
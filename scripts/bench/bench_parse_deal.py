@@ -0,0 +1,72 @@
+"""
+Benchmark for deals_mapping.parse_deal.
+
+Runs without an MT5 server: deals are plain objects carrying the IMTDeal
+attributes. The baseline is a frozen copy of the getattr-per-field parser
+(legacy_deals_mapping.py), also used to check that the outputs are identical.
+
+The rewrite was aimed at 5x; measured on 200k deals it is about 2.4x
+(3.5 s -> 1.5 s). The remaining time is the SDK attribute reads and dict
+construction themselves; no columnar mode was shipped.
+
+    python scripts/bench/bench_parse_deal.py [number_of_deals]
+"""
+
+import os
+import random
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.abspath(os.path.join(BENCH_DIR, "..", "..")))
+sys.path.insert(0, BENCH_DIR)
+
+from app.modules.mt5_manager.deals_mapping import DEAL_FIELDS, parse_deal  # noqa: E402
+from legacy_deals_mapping import parse_deal as legacy_parse_deal  # noqa: E402
+
+
+class FakeDeal:
+    pass
+
+
+def make_deals(n):
+    rng = random.Random(42)
+    deals = []
+    for i in range(n):
+        deal = FakeDeal()
+        for _, attr in DEAL_FIELDS:
+            setattr(deal, attr, rng.random())
+        deal.Deal = i
+        deal.Login = rng.randrange(1000, 2000)
+        deal.Symbol = rng.choice(["EURUSD", "XAUUSD", "US30"])
+        deal.Action = rng.randrange(0, 22)
+        deal.Entry = rng.randrange(0, 4)
+        deal.Reason = rng.randrange(0, 21)
+        deal.ModificationFlags = rng.randrange(0, 512)
+        deals.append(deal)
+    return deals
+
+
+def timed(label, fn, baseline=None):
+    started = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - started
+    speedup = f"  ({baseline / elapsed:.1f}x)" if baseline else ""
+    print(f"{label:<28}{elapsed:8.3f}s{speedup}")
+    return elapsed
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    deals = make_deals(n)
+
+    sample = deals[:1000]
+    assert [legacy_parse_deal(d) for d in sample] == [parse_deal(d) for d in sample]
+
+    print(f"{n} deals")
+    baseline = timed("legacy parse_deal", lambda: [legacy_parse_deal(d) for d in deals])
+    timed("parse_deal", lambda: [parse_deal(d) for d in deals], baseline)
+
+
+if __name__ == "__main__":
+    main()